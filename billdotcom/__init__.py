@@ -6,11 +6,27 @@ visit the `Bill.com developer page <http://www.bill.com/resources/developer-prog
 .. moduleauthor:: Amanda Quint <amanda@britecore.com>, Matt Thompson <matt@britecore.com>
 """
 
+from .asyncsession import *
 from .bill import *
+from .cache import *
 from .chartofaccount import *
+from .coalesce import *
+from .collection import *
 from .config import *
+from .entityview import *
 from .exceptions import *
 from .https import *
+from .loader import *
+from .mirror import *
+from .orgrouter import *
+from .ratelimit import *
+from .retry import *
+from .schema import *
+from .serializer import *
 from .session import *
+from .sessionpool import *
+from .sync import *
+from .tokenstore import *
 from .vendor import *
 from .vendorcredit import *
+from .writebehind import *
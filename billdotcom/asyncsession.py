@@ -0,0 +1,203 @@
+"""
+.. module:: asyncsession
+   :synopsis: A non-blocking Session that runs many requests at once.
+"""
+
+from multiprocessing.pool import ThreadPool
+import collections
+import threading
+from .exceptions import BilldotcomError
+from .https import Transport
+from .session import Session
+
+
+class AsyncSession(object):
+    """A non-blocking counterpart to :class:`billdotcom.session.Session`. Every call
+    returns straight away with an `AsyncResult`, and up to `concurrency` requests are
+    sent at the same time over one shared, logged-in session. Results are the same
+    Billdotcom objects that Session returns.
+
+        >>> with AsyncSession(concurrency=50) as s:
+        >>>     pending = [s.read('Vendor', id) for id in vendor_ids]
+        >>>     vendors = [result.get() for result in pending]
+
+    Use :func:`gather` to run a batch of calls with a tighter limit, and
+    :func:`iter_list` to page through a list while the next pages are being fetched.
+
+    Args:
+        concurrency (int): The most requests in flight at once.
+        session (Session): The session to send with. By default a new one is made
+            from the other keyword arguments, with a transport that keeps a connection
+            open for each worker.
+    """
+
+    def __init__(self, concurrency=10, session=None, **kwargs):
+        # a transport made here is closed with the AsyncSession
+        self._transport = None
+
+        if session is None:
+            if kwargs.get('transport') is None:
+                kwargs['transport'] = self._transport = Transport(pool_maxsize=concurrency)
+            session = Session(**kwargs)
+
+        self.session = session
+        self.concurrency = concurrency
+        self.pool = ThreadPool(concurrency)
+
+    def submit(self, function, *args, **kwargs):
+        """Runs `function(*args, **kwargs)` on a worker.
+
+        Returns:
+            AsyncResult. Call `get()` on it for the return value or exception.
+        """
+        return self.pool.apply_async(function, args, kwargs)
+
+    def post(self, url, data={}, **kwargs):
+        """Sends a request. See :func:`billdotcom.session.Session.post`.
+
+        Returns:
+            AsyncResult of the response data.
+        """
+        return self.submit(self.session.post, url, data, **kwargs)
+
+    def login(self):
+        """Initiate a session on the server.
+
+        Returns:
+            AsyncResult.
+        """
+        return self.submit(self.session.login)
+
+    def logout(self):
+        """Shut down a session on the server.
+
+        Returns:
+            AsyncResult.
+        """
+        return self.submit(self.session.logout)
+
+    def create(self, bdc_object):
+        """Creates a Billdotcom object on the server. See :func:`billdotcom.session.Session.create`.
+
+        Returns:
+            AsyncResult of the newly created object's ID.
+        """
+        return self.submit(self.session.create, bdc_object)
+
+    def read(self, bdc_type, id):
+        """Reads a Billdotcom object from the server. See :func:`billdotcom.session.Session.read`.
+
+        Returns:
+            AsyncResult of the Billdotcom object or None.
+        """
+        return self.submit(self.session.read, bdc_type, id)
+
+    def update(self, bdc_object):
+        """Updates a Billdotcom object on the server. See :func:`billdotcom.session.Session.update`.
+
+        Returns:
+            AsyncResult.
+        """
+        return self.submit(self.session.update, bdc_object)
+
+    def delete(self, bdc_type, id):
+        """Deletes a Billdotcom object on the server. See :func:`billdotcom.session.Session.delete`.
+
+        Returns:
+            AsyncResult.
+        """
+        return self.submit(self.session.delete, bdc_type, id)
+
+    def list(self, bdc_type, sort=[], filters=[], start=0, max=999, lazy=False):
+        """Lists Billdotcom objects on the server. See :func:`billdotcom.session.Session.list`.
+
+        Returns:
+            AsyncResult of the list of objects.
+        """
+        return self.submit(self.session.list, bdc_type, sort, filters, start, max, lazy)
+
+    def iter_list(self, bdc_type, sort=[], filters=[], page_size=999, prefetch=2, lazy=False):
+        """Iterates over every matching Billdotcom object on the server, like
+        :func:`billdotcom.session.Session.iter_list`, but keeps `prefetch` further pages
+        in flight on the workers while the current one is consumed. Pages past the end
+        of the list may be requested and are thrown away.
+
+        Yields:
+            Objects from the server, in order. Iteration stops after the first short page.
+
+        Raises:
+            BilldotcomError, ServerResponseError
+        """
+
+        if not 0 < page_size <= 999:
+            raise BilldotcomError('page size must be between 1 and 999, got {}'.format(page_size))
+
+        pending = collections.deque()
+        start = 0
+
+        while True:
+            while len(pending) <= prefetch:
+                pending.append(self.submit(self.session._list_rows, bdc_type, sort, filters, start, page_size))
+                start += page_size
+
+            rows = self.session._decode(pending.popleft().get())
+
+            for row in rows:
+                yield self.session._hydrate(row, lazy)
+
+            if len(rows) < page_size:
+                break
+
+    def gather(self, calls, limit=None, return_exceptions=False):
+        """Runs a batch of calls on the workers and waits for all of them. Each call is
+        a function that is given the underlying Session:
+
+            >>> vendors = s.gather([lambda session, id=id: session.read('Vendor', id) for id in ids], limit=20)
+
+        Args:
+            calls: Functions taking a Session.
+            limit (int): The most calls from this batch running at once. Defaults to
+                the session's concurrency.
+            return_exceptions (bool): If True, a failed call's exception is put in the
+                results instead of being raised.
+
+        Returns:
+            List of the results, in the same order as `calls`.
+        """
+
+        slots = threading.BoundedSemaphore(limit or self.concurrency)
+
+        def run(call):
+            try:
+                return call(self.session)
+            except Exception as e:
+                if return_exceptions:
+                    return e
+                raise
+            finally:
+                slots.release()
+
+        pending = []
+        for call in calls:
+            slots.acquire()
+            pending.append(self.submit(run, call))
+
+        return [result.get() for result in pending]
+
+    def close(self):
+        """Stops the workers once the calls already submitted have finished."""
+        self.pool.close()
+        self.pool.join()
+
+        if self._transport is not None:
+            self._transport.close()
+
+    def __enter__(self):
+        self.login().get()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        try:
+            self.logout().get()
+        finally:
+            self.close()
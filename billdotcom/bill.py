@@ -3,24 +3,22 @@
    :synopsis: A model for the Bill object.
 """
 
-from jsondict import JSONDict
+from .jsondict import JSONDict
+from .schema import Schema, BOOLEAN, DATE, DATETIME, ENUM, ID, NUMBER, STRING
 
-class Bill(JSONDict):
-    """This models the Bill object.
+
+class BillLineItem(JSONDict):
+    """This models the BillLineItem object. It allows you to further describe a Bill,
+    assigning amounts among individual line items.
 
     Required:
-        ============= ========== ===============================================
+        ============= ========== =====================================================
         *Argument*               *Description*
-        ------------------------ -----------------------------------------------
-        invoiceNumber (str):     The invoice number or identifier.
-        vendorId      (str):     The ID of the vendor that is creating the bill.
-        invoiceDate   (date):    The date that the invoice was billed on.
-        dueDate       (date):    The date that the invoice must be paid by.
-        ============= ========== ===============================================
+        ------------------------ -----------------------------------------------------
+        ============= ========== =====================================================
 
     Creation:
-        Create a Bill object and create it on the server side with
-        with :func:`billdotcom.session.Session.create_bill`. For example:
+        BillLineItems are created along with a Bill. For example
 
             >>> with Session() as s:
             >>>     a = Bill(
@@ -28,52 +26,62 @@ class Bill(JSONDict):
             >>>         invoiceNumber = 'BC1234',
             >>>         invoiceDate = date(2012,10,1),
             >>>         dueDate = date(2012,11,1),
-            >>>         amount = 25.0
+            >>>         amount = 5.0
             >>>     )
+            >>>     a.add_line_item(BillLineItem(amount=2, description="eggs"))
+            >>>     a.add_line_item(BillLineItem(amount=3, description="bacon"))
             >>>     a['id'] = s.create(a)
 
     Retrieval:
-        Download a list of Bill objects from the server with the Session.
-        For example:
-
-            >>> with Session() as s:
-            >>>     print [x['id'] for x in s.list('Bill')]
+        See the :class:`billdotcom.bill.Bill` class for how you can retrieve bills.
     """
 
+    schema = Schema('BillLineItem', fields=(
+        ('id', ID),
+        ('billId', ID),
+        ('lineType', ENUM),
+        ('itemId', ID),
+        ('quantity', NUMBER),
+        ('unitPrice', NUMBER),
+        ('amount', NUMBER),
+        ('description', STRING),
+        ('chartOfAccountId', ID),
+        ('departmentId', ID),
+        ('locationId', ID),
+        ('actgClassId', ID),
+        ('jobId', ID),
+        ('customerId', ID),
+        ('jobBillable', BOOLEAN),
+        ('employeeId', ID),
+        ('createdTime', DATETIME),
+        ('updatedTime', DATETIME),
+    ), required=())
+
     def __init__(self, ignore_required=False, **kwargs):
-        required = (
-            'vendorId',
-            'invoiceNumber',
-            'invoiceDate',
-            'dueDate',
-        )
+        required = self.schema.required
 
         if ignore_required == True:
             required = ()
 
-        super(Bill, self).__init__('Bill', required, **kwargs)
-
-        self.nested_map = {
-            'billLineItems': BillLineItem
-        }
-
-    def add_line_item(self, line_item):
-        self.nested_object.setdefault('billLineItems', [])
-        self.nested_object['billLineItems'].append(line_item)
+        super(BillLineItem, self).__init__('BillLineItem', required, **kwargs)
 
 
-class BillLineItem(JSONDict):
-    """This models the BillLineItem object. It allows you to further describe a Bill,
-    assigning amounts among individual line items.
+class Bill(JSONDict):
+    """This models the Bill object.
 
     Required:
-        ============= ========== =====================================================
+        ============= ========== ===============================================
         *Argument*               *Description*
-        ------------------------ -----------------------------------------------------
-        ============= ========== =====================================================
+        ------------------------ -----------------------------------------------
+        invoiceNumber (str):     The invoice number or identifier.
+        vendorId      (str):     The ID of the vendor that is creating the bill.
+        invoiceDate   (date):    The date that the invoice was billed on.
+        dueDate       (date):    The date that the invoice must be paid by.
+        ============= ========== ===============================================
 
     Creation:
-        BillLineItems are created along with a Bill. For example
+        Create a Bill object and create it on the server side with
+        with :func:`billdotcom.session.Session.create_bill`. For example:
 
             >>> with Session() as s:
             >>>     a = Bill(
@@ -81,21 +89,61 @@ class BillLineItem(JSONDict):
             >>>         invoiceNumber = 'BC1234',
             >>>         invoiceDate = date(2012,10,1),
             >>>         dueDate = date(2012,11,1),
-            >>>         amount = 5.0
+            >>>         amount = 25.0
             >>>     )
-            >>>     a.add_line_item(BillLineItem(amount=2, description="eggs"))
-            >>>     a.add_line_item(BillLineItem(amount=3, description="bacon"))
             >>>     a['id'] = s.create(a)
 
     Retrieval:
-        See the :class:`billdotcom.bill.Bill` class for how you can retrieve bills.
+        Download a list of Bill objects from the server with the Session.
+        For example:
+
+            >>> with Session() as s:
+            >>>     print [x['id'] for x in s.list('Bill')]
     """
 
+    nested_map = {
+        'billLineItems': BillLineItem
+    }
+
+    schema = Schema('Bill', fields=(
+        ('id', ID),
+        ('isActive', ENUM),
+        ('vendorId', ID),
+        ('invoiceNumber', STRING),
+        ('approvalStatus', ENUM),
+        ('invoiceDate', DATE),
+        ('dueDate', DATE),
+        ('glPostingDate', DATE),
+        ('amount', NUMBER),
+        ('scheduledAmount', NUMBER),
+        ('paidAmount', NUMBER),
+        ('paymentStatus', ENUM),
+        ('description', STRING),
+        ('poNumber', STRING),
+        ('externalId', STRING),
+        ('payFromBankAccountId', ID),
+        ('payFromChartOfAccountId', ID),
+        ('createdTime', DATETIME),
+        ('updatedTime', DATETIME),
+    ), required=(
+        'vendorId',
+        'invoiceNumber',
+        'invoiceDate',
+        'dueDate',
+    ), nested=nested_map, enums={
+        'paymentStatus': {'0': 'Paid', '1': 'Open', '2': 'PartiallyPaid', '4': 'Scheduled'},
+        'approvalStatus': {'0': 'Unassigned', '1': 'Assigned', '3': 'Approved', '4': 'Approving', '5': 'Denied'},
+    })
+
     def __init__(self, ignore_required=False, **kwargs):
-        required = ()
+        required = self.schema.required
 
         if ignore_required == True:
             required = ()
 
-        super(BillLineItem, self).__init__('BillLineItem', required, **kwargs)
+        super(Bill, self).__init__('Bill', required, **kwargs)
 
+
+    def add_line_item(self, line_item):
+        self.nested_object.setdefault('billLineItems', [])
+        self.nested_object['billLineItems'].append(line_item)
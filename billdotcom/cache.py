@@ -0,0 +1,109 @@
+"""
+.. module:: cache
+   :synopsis: A read-through cache for objects read from Bill.com.
+"""
+
+import collections
+import threading
+import time
+
+
+class EntityCache(object):
+    """An in-process cache of server responses keyed by (entity type, id), with a
+    least-recently-used size limit and a time-to-live on every entry. Sessions store
+    responses as compact :class:`billdotcom.schema.Record` objects, so large caches
+    stay small.
+
+    Give it to a Session and :func:`billdotcom.session.Session.read` will only go to
+    the server on a miss. Updates and deletes made through the session invalidate
+    the entries they touch:
+
+        >>> cache = EntityCache(maxsize=5000, ttl=600)
+        >>> with Session(cache=cache) as s:
+        >>>     vendor = s.read('Vendor', '00901YYOFDJNAHP2xlg9')
+        >>> print cache.stats()
+
+    Any object with the same `get`, `set` and `delete` methods can be used in its
+    place, for example to share a cache between processes. The cache is safe to share
+    between threads.
+
+    Args:
+        maxsize (int): The most entries kept before the least recently used is dropped.
+        ttl (float): Seconds an entry is valid for. None keeps entries until evicted.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300, clock=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+
+        self.hits = 0
+        self.misses = 0
+
+        # key -> (expiry, value), oldest first
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Gets a cached value.
+
+        Returns:
+            The value, or None if it is not cached or has expired.
+        """
+
+        with self._lock:
+            entry = self._entries.pop(key, None)
+
+            if entry is None or (entry[0] is not None and entry[0] <= self.clock()):
+                self.misses += 1
+                return None
+
+            # re-insert to mark it as most recently used
+            self._entries[key] = entry
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """Caches a value, evicting the least recently used entries if needed."""
+
+        expiry = None if self.ttl is None else self.clock() + self.ttl
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expiry, value)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Drops a value from the cache, if present."""
+
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drops every value and resets the counters."""
+
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Gets the cache counters.
+
+        Returns:
+            Dict with hits, misses, size and hit_rate.
+        """
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return dict(
+                hits = self.hits,
+                misses = self.misses,
+                size = len(self._entries),
+                hit_rate = float(self.hits) / lookups if lookups else 0.0
+            )
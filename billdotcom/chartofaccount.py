@@ -4,6 +4,8 @@
 """
 
 from .jsondict import JSONDict
+from .schema import Schema, DATETIME, ENUM, ID, STRING
+
 
 class ChartOfAccount(JSONDict):
     """This models the Chart of Account object. This is a mapping
@@ -61,14 +63,25 @@ class ChartOfAccount(JSONDict):
             >>>     print [x['id'] for x in s.list('ChartOfAccount')]
     """
 
+    schema = Schema('ChartOfAccount', fields=(
+        ('id', ID),
+        ('isActive', ENUM),
+        ('name', STRING),
+        ('accountType', ENUM),
+        ('accountNumber', STRING),
+        ('description', STRING),
+        ('parentChartOfAccountId', ID),
+        ('createdTime', DATETIME),
+        ('updatedTime', DATETIME),
+    ), required=(
+        'name',
+        'accountType',
+    ))
+
     def __init__(self, ignore_required=False, **kwargs):
-        required = (
-            'name',
-            'accountType',
-        )
+        required = self.schema.required
 
         if ignore_required == True:
             required = ()
 
         super(ChartOfAccount, self).__init__('ChartOfAccount', required, **kwargs)
-
@@ -0,0 +1,114 @@
+"""
+.. module:: coalesce
+   :synopsis: Sharing one request between identical concurrent reads.
+"""
+
+import copy
+import sys
+import threading
+
+# endpoints that only read, so identical requests in flight can share a response
+READ_ONLY_PREFIXES = (
+    'CurrentTime.json',
+    'List/',
+    'Crud/Read/',
+    'Bulk/Crud/Read/',
+)
+
+
+def is_read_only(url):
+    """Checks if a request to an API endpoint only reads data."""
+    return url.startswith(READ_ONLY_PREFIXES)
+
+
+class _Call(object):
+    """A request in flight and the callers waiting for it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiting = 0
+        self.result = None
+        self.error = None
+
+
+class RequestCoalescer(object):
+    """Makes identical read-only requests that are in flight at the same time share
+    one HTTP request. The first caller sends it, and callers that ask for the same
+    thing before it finishes wait for its response instead of sending their own:
+
+        >>> coalescer = RequestCoalescer()
+        >>> with SessionPool(size=8, coalescer=coalescer) as pool:
+        >>>     # fan out reads
+        >>> print coalescer.stats()
+
+    Only requests to endpoints that read are coalesced. Share one coalescer between
+    sessions to coalesce across them; requests are only shared within the same
+    devKey and organization. The coalescer is safe to share between threads.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.coalesced = 0
+
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def call(self, key, function):
+        """Calls `function`, unless a call with the same key is already in flight, in
+        which case its result is waited for and shared.
+
+        Returns:
+            What `function` returned. Callers that shared a result get their own copy.
+
+        Raises:
+            What `function` raised.
+        """
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+
+            if leader:
+                call = self._calls[key] = _Call()
+                self.requests += 1
+            else:
+                call.waiting += 1
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error:
+                raise call.error[0], call.error[1], call.error[2]
+            return copy.deepcopy(call.result)
+
+        result = None
+        try:
+            result = function()
+            return result
+        except:
+            call.error = sys.exc_info()
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+            if call.waiting:
+                # keep a copy of our own, since the first caller may change the result
+                call.result = copy.deepcopy(result)
+            call.done.set()
+
+    def stats(self):
+        """Gets the coalescing counters.
+
+        Returns:
+            Dict with the number of requests sent, the number of calls that shared
+            another call's request, and hit_rate, the share of calls that did.
+        """
+
+        with self._lock:
+            calls = self.requests + self.coalesced
+            return dict(
+                requests = self.requests,
+                coalesced = self.coalesced,
+                hit_rate = float(self.coalesced) / calls if calls else 0.0
+            )
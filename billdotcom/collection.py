@@ -0,0 +1,191 @@
+"""
+.. module:: collection
+   :synopsis: Lists of Billdotcom objects with hash indexes on their fields.
+"""
+
+import collections
+from .jsondict import JSONDict
+
+
+def _key(value):
+    """Makes a field value usable as an index key."""
+
+    if isinstance(value, list):
+        return tuple(_key(x) for x in value)
+    return value
+
+
+class EntityList(list):
+    """A list of Billdotcom objects that can look objects up by any field without a
+    loop. Lists, scans and mirror queries return one, so reconciliation code doesn't
+    have to build its own dicts:
+
+        >>> bills = s.list('Bill')
+        >>> bill = bills.find('invoiceNumber', 'BC1234')
+        >>> by_vendor = bills.group_by('vendorId')
+        >>> eggs = bills.children('billLineItems').find_all('itemId', egg_item_id)
+
+    An index on a field is built the first time the field is looked up, in one pass
+    over the list, and after that lookups take constant time. Objects added with
+    `append`, `extend` or `+=` are added to the indexes already built; other changes
+    to the list drop them, to be rebuilt on the next lookup. If a field of an object
+    already in the list is changed, call :func:`reindex` with it.
+
+    Objects without a field aren't in its index.
+    """
+
+    def __init__(self, iterable=()):
+        super(EntityList, self).__init__(iterable)
+
+        # field -> value -> [objects], in list order
+        self._indexes = {}
+
+    def __reduce__(self):
+        # indexes are rebuilt on first use rather than pickled
+        return EntityList, (list(self),)
+
+    def ensure_index(self, *fields):
+        """Builds the indexes on fields now rather than on first use."""
+
+        for field in fields:
+            self._index(field)
+
+    def _index(self, field):
+        index = self._indexes.get(field)
+
+        if index is None:
+            index = self._indexes[field] = collections.OrderedDict()
+            for bdc_object in self:
+                self._add(index, field, bdc_object)
+
+        return index
+
+    @staticmethod
+    def _add(index, field, bdc_object):
+        if field in bdc_object:
+            index.setdefault(_key(bdc_object[field]), []).append(bdc_object)
+
+    def find(self, field, value, default=None):
+        """Gets the first object with a field equal to value.
+
+        Returns:
+            The object, or `default` if there is none.
+        """
+
+        matches = self._index(field).get(_key(value))
+        return matches[0] if matches else default
+
+    def find_all(self, field, value):
+        """Gets every object with a field equal to value.
+
+        Returns:
+            EntityList, in list order.
+        """
+        return EntityList(self._index(field).get(_key(value), ()))
+
+    def group_by(self, field):
+        """Groups the objects by a field.
+
+        Returns:
+            OrderedDict of field value to an EntityList of the objects with it, in the
+            order the values first appear.
+        """
+
+        return collections.OrderedDict(
+            (value, EntityList(objects)) for value, objects in self._index(field).items()
+        )
+
+    def values_of(self, field):
+        """Gets the distinct values of a field, in the order they first appear."""
+        return list(self._index(field))
+
+    def children(self, field):
+        """Gathers the nested objects in a field of every object, such as line items.
+        Objects added with `add_line_item` are included.
+
+        Returns:
+            EntityList of the nested objects.
+        """
+
+        result = EntityList()
+
+        for bdc_object in self:
+            result.extend(bdc_object.get(field) or ())
+            if isinstance(bdc_object, JSONDict):
+                result.extend(bdc_object.nested_object.get(field, ()))
+
+        return result
+
+    def reindex(self, bdc_object):
+        """Updates the indexes for an object in the list whose fields have changed."""
+
+        for field, index in self._indexes.items():
+            for key, objects in index.items():
+                if any(x is bdc_object for x in objects):
+                    objects[:] = [x for x in objects if x is not bdc_object]
+                    if not objects:
+                        del index[key]
+
+            if field in bdc_object:
+                # keep list order within the group
+                objects = index.setdefault(_key(bdc_object[field]), [])
+                objects.append(bdc_object)
+                positions = dict((id(x), i) for i, x in enumerate(self))
+                objects.sort(key=lambda x: positions[id(x)])
+
+    def append(self, bdc_object):
+        super(EntityList, self).append(bdc_object)
+        for field, index in self._indexes.items():
+            self._add(index, field, bdc_object)
+
+    def extend(self, bdc_objects):
+        for bdc_object in bdc_objects:
+            self.append(bdc_object)
+
+    def __iadd__(self, bdc_objects):
+        self.extend(bdc_objects)
+        return self
+
+    def _changed(self):
+        self._indexes = {}
+
+    def insert(self, i, bdc_object):
+        super(EntityList, self).insert(i, bdc_object)
+        self._changed()
+
+    def remove(self, bdc_object):
+        super(EntityList, self).remove(bdc_object)
+        self._changed()
+
+    def pop(self, *args):
+        self._changed()
+        return super(EntityList, self).pop(*args)
+
+    def sort(self, *args, **kwargs):
+        super(EntityList, self).sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        super(EntityList, self).reverse()
+        self._changed()
+
+    def __setitem__(self, i, value):
+        super(EntityList, self).__setitem__(i, value)
+        self._changed()
+
+    def __delitem__(self, i):
+        super(EntityList, self).__delitem__(i)
+        self._changed()
+
+    def __setslice__(self, i, j, values):
+        super(EntityList, self).__setslice__(i, j, values)
+        self._changed()
+
+    def __delslice__(self, i, j):
+        super(EntityList, self).__delslice__(i, j)
+        self._changed()
+
+    def __imul__(self, n):
+        super(EntityList, self).__imul__(n)
+        self._changed()
+        return self
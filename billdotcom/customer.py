@@ -4,6 +4,8 @@
 """
 
 from .jsondict import JSONDict
+from .schema import Schema, BOOLEAN, DATETIME, ENUM, ID, STRING
+
 
 class Customer(JSONDict):
     """This models the Customer object. In Bill.com customers are what
@@ -32,13 +34,52 @@ class Customer(JSONDict):
             >>>     print [x['id'] for x in s.list('Customer')]
     """
 
+    schema = Schema('Customer', fields=(
+        ('id', ID),
+        ('isActive', ENUM),
+        ('name', STRING),
+        ('shortName', STRING),
+        ('parentCustomerId', ID),
+        ('companyName', STRING),
+        ('contactFirstName', STRING),
+        ('contactLastName', STRING),
+        ('accNumber', STRING),
+        ('billAddress1', STRING),
+        ('billAddress2', STRING),
+        ('billAddress3', STRING),
+        ('billAddress4', STRING),
+        ('billAddressCity', STRING),
+        ('billAddressState', STRING),
+        ('billAddressCountry', STRING),
+        ('billAddressZip', STRING),
+        ('shipAddress1', STRING),
+        ('shipAddress2', STRING),
+        ('shipAddress3', STRING),
+        ('shipAddress4', STRING),
+        ('shipAddressCity', STRING),
+        ('shipAddressState', STRING),
+        ('shipAddressCountry', STRING),
+        ('shipAddressZip', STRING),
+        ('email', STRING),
+        ('phone', STRING),
+        ('altPhone', STRING),
+        ('fax', STRING),
+        ('description', STRING),
+        ('printAs', STRING),
+        ('accountType', ENUM),
+        ('hasAutoPay', BOOLEAN),
+        ('externalId', STRING),
+        ('mergedIntoId', ID),
+        ('createdTime', DATETIME),
+        ('updatedTime', DATETIME),
+    ), required=(
+        'name',
+    ))
+
     def __init__(self, ignore_required=False, **kwargs):
-        required = (
-            'name',
-        )
+        required = self.schema.required
 
         if ignore_required == True:
             required = ()
 
         super(Customer, self).__init__('Customer', required, **kwargs)
-
@@ -0,0 +1,89 @@
+"""
+.. module:: entityview
+   :synopsis: Lightweight read-only views over rows from the server.
+"""
+
+import collections
+import copy
+from .exceptions import BilldotcomError
+
+
+class EntityView(collections.Mapping):
+    """A read-only view over a row decoded from a server response, for jobs that only
+    read a few fields of many objects. The row isn't copied or checked, and nested
+    lists of objects, such as line items, are only wrapped in views when they are
+    first accessed:
+
+        >>> with Session() as s:
+        >>>     total = sum(bill['amount'] for bill in s.iter_list('Bill', lazy=True))
+
+    Call :func:`promote` to get a full Billdotcom object that can be changed and
+    sent back to the server.
+
+    Args:
+        bdc_class: The Billdotcom class the row is an object of.
+        row (dict): The row from the server. It is used as is, so it shouldn't be
+            changed afterwards.
+    """
+
+    __slots__ = ('bdc_class', 'row', '_children')
+
+    def __init__(self, bdc_class, row):
+        self.bdc_class = bdc_class
+        self.row = row
+        # views over nested lists of objects, made on first access
+        self._children = None
+
+    @property
+    def name(self):
+        return self.row.get('entity')
+
+    @property
+    def url(self):
+        return '{}.json'.format(self.name)
+
+    def __getitem__(self, key):
+        value = self.row[str(key)]
+
+        if not isinstance(value, list) or not value or not isinstance(value[0], dict):
+            return value
+
+        if self._children is None:
+            self._children = {}
+
+        children = self._children.get(key)
+        if children is None:
+            children = self._children[key] = tuple(EntityView(None, child) for child in value)
+
+        return children
+
+    def __iter__(self):
+        return iter(self.row)
+
+    def __len__(self):
+        return len(self.row)
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(self.__class__.__name__, self.row)
+
+    def for_json(self):
+        """Gets the row, for :func:`billdotcom.serializer.dumps`."""
+        return self.row
+
+    def promote(self):
+        """Builds a full Billdotcom object from the row, tracking changes from here on.
+
+        Returns:
+            A new object of the view's class. Changing it doesn't change the view.
+
+        Raises:
+            BilldotcomError for views of nested objects, which are promoted along
+            with the object holding them.
+        """
+
+        if self.bdc_class is None:
+            raise BilldotcomError('nested {} objects are promoted with their parent'.format(self.name))
+
+        bdc_object = self.bdc_class(**copy.deepcopy(self.row))
+        bdc_object.mark_clean()
+        return bdc_object
@@ -18,7 +18,20 @@ class ConfigurationError(BilldotcomError):
 class HTTPError(BilldotcomError):
     """An exception raised when an HTTP request returns with a bad code."""
 
+    def __init__(self, message, status_code=None):
+        super(HTTPError, self).__init__(message)
+        self.status_code = status_code
+
 
 class ServerResponseError(BilldotcomError):
     """An exception raised when the server reponds that a request failed."""
 
+    def __init__(self, message, error_code=None):
+        super(ServerResponseError, self).__init__(message)
+        self.error_code = error_code
+
+
+class TransportError(ServerResponseError):
+    """An exception raised when a request could not be sent or got no response."""
+
+
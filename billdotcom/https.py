@@ -1,12 +1,121 @@
 """Wrapper for https auth. Uses requests."""
 
 import requests
+import requests.adapters
+import codecs
 import json
+import re
+import threading
 from config import API_URL, get_logger
-from exceptions import HTTPError, ServerResponseError
+from exceptions import HTTPError, ServerResponseError, TransportError
 
 OK_CODES = [200]
 
+# number of per-host connection pools kept by a transport
+DEFAULT_POOL_CONNECTIONS = 4
+
+# maximum number of keep-alive connections kept open to a single host
+DEFAULT_POOL_MAXSIZE = 10
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (10, 120)
+
+# bytes read from the socket at a time when decoding a streamed response
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class Transport(object):
+    """A pooled, keep-alive HTTP transport for talking to Bill.com.
+
+    Connections are kept open between requests, so sequential calls reuse a warm
+    TCP/TLS connection instead of doing a new handshake every time. A transport is
+    safe to share between threads and between sessions:
+
+        >>> transport = Transport(pool_maxsize=20)
+        >>> with Session(transport=transport) as s:
+        >>>     # do stuff
+
+    Args:
+        pool_connections (int): The number of hosts to keep connection pools for.
+        pool_maxsize (int): The maximum number of connections kept open per host.
+        pool_block (bool): If True, requests wait for a free connection instead of
+            opening (and then discarding) an extra one when the pool is exhausted.
+        timeout (float or tuple): Seconds to wait for the server, either a single
+            value or a (connect, read) tuple.
+        api_url (str): The API root to send requests to. Defaults to
+            :data:`billdotcom.config.API_URL`; point it at a local stand-in server for testing.
+        rate_limiter (RateLimiter): Paces every request sent through the transport.
+            See :mod:`billdotcom.ratelimit`.
+    """
+
+    def __init__(self, pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 pool_block=False, timeout=DEFAULT_TIMEOUT, api_url=None, rate_limiter=None):
+        self.timeout = timeout
+        self.api_url = api_url or API_URL
+        self.rate_limiter = rate_limiter
+
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block
+        )
+
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def post(self, url, params=None, data=None, headers=None, rate_limiter=None, stream=False):
+        """Sends a POST request over a pooled connection, waiting for the rate limiter
+        first if there is one.
+
+        Args:
+            rate_limiter (RateLimiter): Used instead of the transport's own rate limiter.
+            stream (bool): If True, return once the headers arrive and leave the body
+                to be read from the response. The connection goes back to the pool
+                once the body has been read or the response is closed.
+
+        Returns:
+            requests.Response
+        """
+
+        rate_limiter = rate_limiter or self.rate_limiter
+
+        kwargs = dict(params=params, data=data, headers=headers, timeout=self.timeout, stream=stream)
+
+        if rate_limiter is None:
+            return self.session.post(url, **kwargs)
+
+        with rate_limiter.limit():
+            return self.session.post(url, **kwargs)
+
+    def close(self):
+        """Closes all pooled connections."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+
+_default_transport = None
+_default_transport_lock = threading.Lock()
+
+def get_transport():
+    """Gets the global transport, creating it if needed.
+
+    Returns:
+        Transport.
+    """
+    global _default_transport
+
+    with _default_transport_lock:
+        if _default_transport is None:
+            _default_transport = Transport()
+
+    return _default_transport
+
 def get_status_and_message(data):
     '''Parse the status and error message (if applicable) from a JSON dict.
 
@@ -20,7 +129,6 @@ def get_status_and_message(data):
         error_code = data['response_data']['error_code']
         error_message = data['response_data']['error_message']
 
-        print data
         if not error_message:
             error_message = "NOCODE"
 
@@ -29,12 +137,16 @@ def get_status_and_message(data):
     return (status, message)
 
 
-def https_post(url, payload, params={}, ignore_status=False):
+def https_post(url, payload, params={}, ignore_status=False, transport=None, rate_limiter=None):
     '''Posts a data payload to Bill.com. It can optionally check for failed status.
 
     Args:
         payload (dict): A JSON compatible dict with data to send to bill.com's api.
         ignore_status (bool): If True, don't check for failed status codes.
+        transport (Transport): The transport to send with. Defaults to the
+            global transport from :func:`get_transport`.
+        rate_limiter (RateLimiter): Paces the request instead of the transport's own
+            rate limiter.
 
     Returns:
         Dict of the JSON response.
@@ -45,21 +157,25 @@ def https_post(url, payload, params={}, ignore_status=False):
     '''
     LOG = get_logger()
 
-    api_url = API_URL + '/' + url
+    if transport is None:
+        transport = get_transport()
+
+    api_url = transport.api_url + '/' + url
 
     headers = {'content-type': 'application/x-www-form-urlencoded'}
 
     try:
-        response = requests.post(api_url, params=params, data=payload, headers=headers)
+        response = transport.post(api_url, params=params, data=payload, headers=headers,
+                                  rate_limiter=rate_limiter)
     except Exception as e:
-        raise ServerResponseError('Could not post to {0}: {1}'.format(api_url, e))
+        raise TransportError('Could not post to {0}: {1}'.format(api_url, e))
 
     if response.status_code not in OK_CODES:
         message = "received HTTP {0}: {1} when sending to {2}: {3}".format(
-                    response.status_code, response.text, API_URL, payload
+                    response.status_code, response.text, transport.api_url, payload
         )
         LOG.error(message)
-        raise HTTPError(message)
+        raise HTTPError(message, response.status_code)
 
     try:
         data = json.loads(response.text)
@@ -75,8 +191,187 @@ def https_post(url, payload, params={}, ignore_status=False):
         LOG.error(message)
         LOG.error("SENT TO {}: {}".format(response.url, payload))
         LOG.error("RECEIVED {}".format(data))
-        raise ServerResponseError(message)
+        raise ServerResponseError(message, data['response_data'].get('error_code'))
 
     return data['response_data']
 
 
+
+
+# where the response_data value starts in a response
+_RESPONSE_DATA = re.compile(r'"response_data"\s*:\s*')
+_WHITESPACE = re.compile(r'\s*')
+
+
+class _StreamReader(object):
+    """Reads a streamed JSON response into a buffer a chunk at a time."""
+
+    def __init__(self, response, chunk_size):
+        self.response = response
+        self.chunks = response.iter_content(chunk_size)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = u''
+        self.pos = 0
+        self.eof = False
+        # whether text before pos can be dropped
+        self.trim = False
+
+    def read(self):
+        """Adds the next chunk to the buffer.
+
+        Returns:
+            False at the end of the response.
+        """
+
+        if self.eof:
+            return False
+
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.eof = True
+            self.buffer += self.decoder.decode(b'', final=True)
+            return False
+
+        if self.trim:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+
+        self.buffer += self.decoder.decode(chunk)
+        return True
+
+    def find(self, pattern):
+        """Moves past the first match of a regex.
+
+        Returns:
+            False if the response has no match.
+        """
+
+        while True:
+            match = pattern.search(self.buffer, self.pos)
+            # the match can only be trusted if it isn't cut off by the end of the buffer
+            if match and (match.end() < len(self.buffer) or self.eof):
+                self.pos = match.end()
+                return True
+            if not self.read() and not match:
+                return False
+
+    def peek(self):
+        """Skips whitespace and gets the next character, or '' at the end."""
+
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read():
+                return u''
+
+    def rest(self):
+        """Reads the rest of the response and gets the whole buffer."""
+
+        while self.read():
+            pass
+        return self.buffer
+
+    def rows(self):
+        """Decodes the JSON array starting at pos one element at a time."""
+
+        decoder = json.JSONDecoder()
+        self.trim = True
+        self.pos += 1
+
+        try:
+            while True:
+                char = self.peek()
+                if char == u',':
+                    self.pos += 1
+                    continue
+                if char == u']':
+                    # read the little that's left so the connection can be reused
+                    self.rest()
+                    return
+                if not char:
+                    raise ValueError('response ended in the middle of response_data')
+
+                while True:
+                    try:
+                        row, self.pos = decoder.raw_decode(self.buffer, self.pos)
+                        break
+                    except ValueError:
+                        # the row isn't all here yet
+                        if not self.read():
+                            raise
+
+                yield row
+        finally:
+            self.response.close()
+
+
+def https_post_stream(url, payload, params={}, transport=None, rate_limiter=None, chunk_size=STREAM_CHUNK_SIZE):
+    '''Posts a data payload to Bill.com and decodes a list response as it arrives from
+    the socket, so only about one row is held in memory at a time.
+
+    The request is sent and checked for a failed status before this returns; the rows
+    are then read from the connection as the returned iterator is consumed.
+
+    Args:
+        payload (dict): A JSON compatible dict with data to send to bill.com's api.
+        transport (Transport): The transport to send with. Defaults to the
+            global transport from :func:`get_transport`.
+        rate_limiter (RateLimiter): Paces the request instead of the transport's own
+            rate limiter.
+        chunk_size (int): Bytes read from the socket at a time.
+
+    Returns:
+        Iterator of the dicts in the response data.
+
+    Raises:
+        ServerReponseError
+        HTTPError
+    '''
+    LOG = get_logger()
+
+    if transport is None:
+        transport = get_transport()
+
+    api_url = transport.api_url + '/' + url
+
+    headers = {'content-type': 'application/x-www-form-urlencoded'}
+
+    try:
+        response = transport.post(api_url, params=params, data=payload, headers=headers,
+                                  rate_limiter=rate_limiter, stream=True)
+    except Exception as e:
+        raise TransportError('Could not post to {0}: {1}'.format(api_url, e))
+
+    if response.status_code not in OK_CODES:
+        message = "received HTTP {0}: {1} when sending to {2}: {3}".format(
+                    response.status_code, response.text, transport.api_url, payload
+        )
+        LOG.error(message)
+        raise HTTPError(message, response.status_code)
+
+    reader = _StreamReader(response, chunk_size)
+
+    try:
+        if reader.find(_RESPONSE_DATA) and reader.peek() == u'[':
+            return reader.rows()
+
+        # not a list, so it's a failure or some other response; decode it whole
+        text = reader.rest()
+        data = json.loads(text)
+        status, message = get_status_and_message(data)
+    except Exception as e:
+        response.close()
+        if isinstance(e, ValueError):
+            LOG.error('sent {0} got badly formatted reponse: {1}'.format(payload, reader.buffer))
+        raise
+
+    if status:
+        LOG.error(message)
+        LOG.error("SENT TO {}: {}".format(response.url, payload))
+        LOG.error("RECEIVED {}".format(data))
+        raise ServerResponseError(message, data['response_data'].get('error_code'))
+
+    rows = data['response_data']
+    return iter(rows if isinstance(rows, list) else [rows])
@@ -4,6 +4,70 @@
 """
 
 from .jsondict import JSONDict
+from .schema import Schema, BOOLEAN, DATE, DATETIME, ENUM, ID, NUMBER, STRING
+
+
+class InvoiceLineItem(JSONDict):
+    """This models the InvoiceLineItem object. It allows you to further describe an Invoice,
+    assigning amounts among individual line items.
+
+    Required:
+        ============= ========== =====================================================
+        *Argument*               *Description*
+        ------------------------ -----------------------------------------------------
+        ============= ========== =====================================================
+
+    Creation:
+        InvoiceLineItems are created along with an Invoice. For example
+
+            >>> with Session() as s:
+            >>>     a = Invoice(
+            >>>         externalId = '123456',
+            >>>         customerId = 'abc123',
+            >>>         invoiceNumber = 'BC1234',
+            >>>         invoiceDate = date(2012,10,1),
+            >>>         dueDate = date(2012,11,1),
+            >>>         amount = 5.0
+            >>>     )
+            >>>     a.add_line_item(InvoiceLineItem(amount=2, description="eggs"))
+            >>>     a.add_line_item(InvoiceLineItem(amount=3, description="bacon"))
+            >>>     a['id'] = s.create(a)
+
+    Retrieval:
+        See the :class:`billdotcom.bill.Invoice` class for how you can retrieve invoices.
+    """
+
+    schema = Schema('InvoiceLineItem', fields=(
+        ('id', ID),
+        ('invoiceId', ID),
+        ('itemId', ID),
+        ('quantity', NUMBER),
+        ('amount', NUMBER),
+        ('price', NUMBER),
+        ('ratePercent', NUMBER),
+        ('description', STRING),
+        ('chartOfAccountId', ID),
+        ('departmentId', ID),
+        ('locationId', ID),
+        ('actgClassId', ID),
+        ('jobId', ID),
+        ('taxable', BOOLEAN),
+        ('taxCode', STRING),
+        ('createdTime', DATETIME),
+        ('updatedTime', DATETIME),
+    ), required=(
+        'itemId',
+        'quantity',
+    ))
+
+    def __init__(self, ignore_required=False, **kwargs):
+        required = self.schema.required
+
+        if ignore_required == True:
+            required = ()
+
+        super(InvoiceLineItem, self).__init__('InvoiceLineItem', required, **kwargs)
+
 
 class Invoice(JSONDict):
     """This models the Invoice object.
@@ -41,67 +105,66 @@ class Invoice(JSONDict):
             >>>     print [x['id'] for x in s.list('invoice')]
     """
 
+    nested_map = {
+        'invoiceLineItems': InvoiceLineItem
+    }
+
+    schema = Schema('Invoice', fields=(
+        ('id', ID),
+        ('isActive', ENUM),
+        ('customerId', ID),
+        ('invoiceNumber', STRING),
+        ('invoiceDate', DATE),
+        ('dueDate', DATE),
+        ('glPostingDate', DATE),
+        ('amount', NUMBER),
+        ('amountDue', NUMBER),
+        ('creditAmount', NUMBER),
+        ('paymentStatus', ENUM),
+        ('description', STRING),
+        ('poNumber', STRING),
+        ('externalId', STRING),
+        ('isToBePrinted', BOOLEAN),
+        ('isToBeEmailed', BOOLEAN),
+        ('lastSentTime', DATETIME),
+        ('itemSalesTax', ID),
+        ('salesTaxPercentage', NUMBER),
+        ('salesTaxTotal', NUMBER),
+        ('terms', STRING),
+        ('salesRep', STRING),
+        ('FOB', STRING),
+        ('shipDate', DATE),
+        ('shipMethod', STRING),
+        ('departmentId', ID),
+        ('locationId', ID),
+        ('actgClassId', ID),
+        ('jobId', ID),
+        ('payToBankAccountId', ID),
+        ('payToChartOfAccountId', ID),
+        ('invoiceTemplateId', ID),
+        ('hasAutoPay', BOOLEAN),
+        ('source', ENUM),
+        ('createdTime', DATETIME),
+        ('updatedTime', DATETIME),
+    ), required=(
+        'customerId',
+        'invoiceNumber',
+        'invoiceDate',
+        'dueDate',
+    ), nested=nested_map, enums={
+        'paymentStatus': {'0': 'Paid', '1': 'Open', '2': 'PartiallyPaid', '4': 'Scheduled'},
+    })
+
     def __init__(self, ignore_required=False, **kwargs):
-        required = (
-            'customerId',
-            'invoiceNumber',
-            'invoiceDate',
-            'dueDate',
-        )
+        required = self.schema.required
 
         if ignore_required == True:
             required = ()
 
         super(Invoice, self).__init__('Invoice', required, **kwargs)
 
-        self.nested_map = {
-            'invoiceLineItems': InvoiceLineItem
-        }
         self.convert_nested()
 
     def add_line_item(self, line_item):
         self.nested_object.setdefault('invoiceLineItems', [])
         self.nested_object['invoiceLineItems'].append(line_item)
-
-
-class InvoiceLineItem(JSONDict):
-    """This models the InvoiceLineItem object. It allows you to further describe an Invoice,
-    assigning amounts among individual line items.
-
-    Required:
-        ============= ========== =====================================================
-        *Argument*               *Description*
-        ------------------------ -----------------------------------------------------
-        ============= ========== =====================================================
-
-    Creation:
-        InvoiceLineItems are created along with an Invoice. For example
-
-            >>> with Session() as s:
-            >>>     a = Invoice(
-            >>>         externalId = '123456',
-            >>>         customerId = 'abc123',
-            >>>         invoiceNumber = 'BC1234',
-            >>>         invoiceDate = date(2012,10,1),
-            >>>         dueDate = date(2012,11,1),
-            >>>         amount = 5.0
-            >>>     )
-            >>>     a.add_line_item(InvoiceLineItem(amount=2, description="eggs"))
-            >>>     a.add_line_item(InvoiceLineItem(amount=3, description="bacon"))
-            >>>     a['id'] = s.create(a)
-
-    Retrieval:
-        See the :class:`billdotcom.bill.Invoice` class for how you can retrieve invoices.
-    """
-
-    def __init__(self, ignore_required=False, **kwargs):
-        required = (
-            'itemId',
-            'quantity'
-        )
-
-        if ignore_required == True:
-            required = ()
-
-        super(InvoiceLineItem, self).__init__('InvoiceLineItem', required, **kwargs)
-
@@ -4,6 +4,8 @@
 """
 
 from .jsondict import JSONDict
+from .schema import Schema, BOOLEAN, DATETIME, ENUM, ID, NUMBER, STRING
+
 
 class Item(JSONDict):
     """This models the Item object. 
@@ -37,14 +39,35 @@ class Item(JSONDict):
             >>>     print [x['id'] for x in s.list('item')]
     """
 
+    schema = Schema('Item', fields=(
+        ('id', ID),
+        ('isActive', ENUM),
+        ('type', ENUM),
+        ('name', STRING),
+        ('shortName', STRING),
+        ('description', STRING),
+        ('parentItemId', ID),
+        ('price', NUMBER),
+        ('percentage', NUMBER),
+        ('expenseRate', NUMBER),
+        ('chartOfAccountId', ID),
+        ('expenseChartOfAccountId', ID),
+        ('actgClassId', ID),
+        ('departmentId', ID),
+        ('locationId', ID),
+        ('taxable', BOOLEAN),
+        ('externalId', STRING),
+        ('createdTime', DATETIME),
+        ('updatedTime', DATETIME),
+    ), required=(
+        'name',
+        'type',
+    ))
+
     def __init__(self, ignore_required=False, **kwargs):
-        required = (
-            'name',
-            'type',
-        )
+        required = self.schema.required
 
         if ignore_required == True:
             required = ()
 
         super(Item, self).__init__('Item', required, **kwargs)
-
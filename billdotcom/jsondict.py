@@ -4,11 +4,8 @@
 """
 
 import collections
-import copy
-import time
-import datetime
-import decimal
 from .exceptions import BilldotcomError
+from .serializer import format_value
 
 
 class JSONDict(collections.MutableMapping):
@@ -19,8 +16,27 @@ class JSONDict(collections.MutableMapping):
     Creation:
         Create a Bill object and create it on the server side with
         with :func:`billdotcom.session.Session.create_bill`. For example:
+
+    Changes:
+        Objects read from the server keep track of which fields have been changed
+        since, so :func:`billdotcom.session.Session.update` only sends those (see
+        :attr:`delta`) and skips objects that haven't changed. Nested objects in the
+        class's `nested_map`, such as line items, are tracked too, and a nested list
+        counts as changed when items are added, removed or replaced. Line items from the
+        server become objects the first time their field is read. Other lists holding
+        plain dicts can't be tracked and always count as changed.
+
+    Schema:
+        Each class describes its fields once in a :class:`billdotcom.schema.Schema`,
+        which is also used to hold objects compactly; see :func:`compact`.
     """
 
+    # the fields of the entity, see billdotcom.schema
+    schema = None
+
+    # the nested map is {'objname': ChildClass}, the same for every object of a class
+    nested_map = {}
+
     def __init__(self, bdc_name, required, **kwargs):
         for key in required:
             if key not in kwargs:
@@ -28,17 +44,24 @@ class JSONDict(collections.MutableMapping):
 
         self.name = bdc_name
         self.url = bdc_name + '.json'
+        self.required = required
         self.__payload = dict(
             entity = bdc_name
         )
         self.__payload.update(kwargs)
 
+        # the fields changed since mark_clean, or None when every field counts as changed
+        self.__dirty = None
+
+        # list field -> the items it held at mark_clean
+        self.__clean_lists = {}
+
+        # nested fields still holding the plain dicts they had at mark_clean
+        self.__unconverted = None
+
         # the nested objects are {'objname': [list, of, things]}
         self.nested_object = {}
 
-        # the nested map is {'objname': ChildClass}
-        self.nested_map = {}
-
     def convert_nested(self):
         for key, value in self.__payload.items():
             nested_obj = self.nested_map.get(key)
@@ -47,13 +70,30 @@ class JSONDict(collections.MutableMapping):
                 self.__payload[key] = children
 
     def __getitem__(self, key):
-        return self.__payload[self.__keytransform__(key)]
+        key = self.__keytransform__(key)
+        if self.__unconverted and key in self.__unconverted:
+            self.__track_nested(key)
+        return self.__payload[key]
 
     def __setitem__(self, key, value):
-        self.__payload[self.__keytransform__(key)] = value
+        key = self.__keytransform__(key)
+        if self.__unconverted:
+            self.__unconverted.discard(key)
+        if self.__dirty is not None and (key not in self.__payload or self.__payload[key] != value):
+            self.__dirty.add(key)
+        self.__payload[key] = value
 
     def __delitem__(self, key):
-        del self.__payload[self.__keytransform__(key)]
+        key = self.__keytransform__(key)
+        if self.__unconverted:
+            self.__unconverted.discard(key)
+        del self.__payload[key]
+        if self.__dirty is not None:
+            self.__dirty.add(key)
+
+    def __contains__(self, key):
+        # checked without __getitem__, which would convert nested fields
+        return self.__keytransform__(key) in self.__payload
 
     def __iter__(self):
         return iter(self.__payload)
@@ -72,6 +112,121 @@ class JSONDict(collections.MutableMapping):
         content = ("{0}='{1}'".format(key, value) for key, value in self.__payload.items())
         return '{0}({1})'.format(self.__class__.__name__, ', '.join(content))
 
+    def mark_clean(self):
+        """Starts tracking changes, treating the current fields (and those of any nested
+        objects) as matching the server.
+        """
+
+        self.__dirty = set()
+        self.__clean_lists = {}
+        self.__unconverted = None
+
+        for key, value in self.__payload.items():
+            if not isinstance(value, list):
+                continue
+
+            if key in self.nested_map and any(isinstance(child, dict) for child in value):
+                # the plain dicts from the server only become tracked objects when the
+                # field is first read, since they can't change before then
+                if self.__unconverted is None:
+                    self.__unconverted = set()
+                self.__unconverted.add(key)
+                continue
+
+            for child in value:
+                if isinstance(child, JSONDict):
+                    child.mark_clean()
+
+            self.__clean_lists[key] = list(value)
+
+    def __track_nested(self, key):
+        """Turns the plain dicts in a nested field into tracked objects, which can report
+        their own changes.
+        """
+
+        self.__unconverted.discard(key)
+
+        child_class = self.nested_map[key]
+        value = [
+            child_class(ignore_required=True, **child) if isinstance(child, dict) else child
+            for child in self.__payload[key]
+        ]
+
+        for child in value:
+            if isinstance(child, JSONDict):
+                child.mark_clean()
+
+        self.__payload[key] = value
+        self.__clean_lists[key] = list(value)
+
+    def compact(self):
+        """Builds a compact copy of the object's fields, for holding many objects in
+        memory. Objects added with `add_line_item` are included.
+
+        Returns:
+            billdotcom.schema.Record.
+
+        Raises:
+            BilldotcomError if the class has no schema.
+        """
+
+        if self.schema is None:
+            raise BilldotcomError('{} objects have no schema'.format(self.name))
+
+        row = dict(self.__payload)
+        row.update(self.nested_object)
+        return self.schema.record(row)
+
+    @property
+    def tracked(self):
+        """True if changes are being tracked. See :func:`mark_clean`."""
+        return self.__dirty is not None
+
+    @property
+    def changed(self):
+        """The names of the fields changed since :func:`mark_clean`, including nested
+        lists whose items changed. Every field if changes aren't tracked.
+        """
+
+        if self.__dirty is None:
+            return set(self.__payload) | set(self.nested_object)
+
+        changed = set(self.__dirty) | set(self.nested_object)
+
+        for key, value in self.__payload.items():
+            if not isinstance(value, list) or key in changed:
+                continue
+            if self.__unconverted and key in self.__unconverted:
+                # never read, so it can't have changed
+                continue
+
+            clean = self.__clean_lists.get(key)
+            if clean is None or len(clean) != len(value) or any(x is not y for x, y in zip(clean, value)):
+                changed.add(key)
+            elif any(isinstance(child, dict) or (isinstance(child, JSONDict) and child.changed)
+                     for child in value):
+                changed.add(key)
+
+        return changed
+
+    @property
+    def delta(self):
+        """
+        Builds the smallest JSON-compatible dict that updates the object on Bill.com:
+        the entity, id and required fields plus the changed ones. Without change
+        tracking this is the same as :attr:`data`.
+
+        Returns:
+            Dict representing the changes to the object.
+        """
+
+        if self.__dirty is None:
+            return self.data
+
+        keep = self.changed | set(self.required) | set(['entity', 'id'])
+
+        return { key: value for key, value in self.data.items() if key in keep }
+
     @property
     def data(self):
         """
@@ -84,19 +239,13 @@ class JSONDict(collections.MutableMapping):
             BilldotcomError when the object was built incorrectly
         """
 
-        obj = copy.deepcopy(self.__payload)
-
         def format_val(value):
-            if type(value) in (datetime.date, datetime.datetime):
-                # needs to be in iso8601
-                return '{:%Y-%m-%dT%H:%M:%S}{:+06.2f}'.format(value, time.timezone/3600.0)
-            if type(value) is decimal.Decimal:
-                return float(value)
-            else:
-                return value
+            if isinstance(value, list):
+                return [x.data if isinstance(x, JSONDict) else format_value(x) for x in value]
+            return format_value(value)
 
         # filter out None valued keys and format them
-        obj = { key: format_val(value) for key, value in obj.items() if value }
+        obj = { key: format_val(value) for key, value in self.__payload.items() if value }
 
         for name, children in self.nested_object.items():
             if name in obj:
@@ -105,3 +254,21 @@ class JSONDict(collections.MutableMapping):
 
         return obj
 
+    def for_json(self):
+        """
+        Builds a shallow dict of the fields to send, for :func:`billdotcom.serializer.dumps`.
+        Unlike :attr:`data`, values are left for the encoder to format as it reaches them.
+
+        Raises:
+            BilldotcomError when the object was built incorrectly
+        """
+
+        obj = { key: value for key, value in self.__payload.items() if value }
+
+        for name, children in self.nested_object.items():
+            if name in obj:
+                raise BilldotcomError('nested object {} already exists in the {} properties'.format(name, self.url))
+            obj[name] = children
+
+        return obj
+
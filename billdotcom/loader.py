@@ -0,0 +1,165 @@
+"""
+.. module:: loader
+   :synopsis: Resolving the objects that other objects refer to in batches.
+"""
+
+from multiprocessing.pool import ThreadPool
+from .exceptions import BilldotcomError
+from .jsondict import JSONDict
+from .session import Session
+
+# fields holding the id of another object -> the type of that object
+RELATIONS = {
+    'vendorId': 'Vendor',
+    'customerId': 'Customer',
+    'itemId': 'Item',
+    'chartOfAccountId': 'ChartOfAccount',
+}
+
+
+class RelationLoader(object):
+    """Looks up the objects a set of objects refer to, such as the vendor of each bill
+    and the item of each line item, in a few batched requests instead of a
+    :func:`billdotcom.session.Session.read` for each reference:
+
+        >>> loader = RelationLoader(s)
+        >>> loader.resolve(bills)
+        >>> for bill in bills:
+        >>>     vendor = loader.related(bill, 'vendorId')
+        >>>     items = [loader.related(line, 'itemId') for line in bill['billLineItems']]
+
+    References can also be queued one at a time with :func:`want` and fetched together
+    with :func:`load`. The ids of each type are deduplicated and fetched with
+    :func:`billdotcom.session.Session.read_many`, so the session's cache is used, and
+    the types are fetched at the same time. Everything loaded is kept for the life of
+    the loader, so a reference is only fetched once.
+
+    Args:
+        session (Session): A logged-in session.
+        relations (dict): Field name to the type of object it refers to. Defaults to
+            :data:`RELATIONS`.
+        chunk_size (int): Ids sent per request.
+        workers (int): The most types fetched at the same time.
+    """
+
+    def __init__(self, session, relations=None, chunk_size=100, workers=4):
+        self.session = session
+        self.relations = relations if relations is not None else dict(RELATIONS)
+        self.chunk_size = chunk_size
+        self.workers = workers
+
+        # (type, id) -> object, or None if it wasn't found
+        self.loaded = {}
+        # type -> ids queued to load
+        self._wanted = {}
+
+    def want(self, bdc_type, id):
+        """Queues an object to be fetched by the next :func:`load`."""
+
+        if bdc_type not in Session.type_map:
+            raise BilldotcomError('object type {} is not supported'.format(bdc_type))
+
+        if id and (bdc_type, id) not in self.loaded:
+            self._wanted.setdefault(bdc_type, set()).add(id)
+
+    def want_related(self, bdc_objects, fields=None):
+        """Queues the objects referred to by objects and their nested objects, such as
+        line items.
+
+        Args:
+            bdc_objects: Billdotcom objects, views, records or rows.
+            fields: The reference fields to follow. Defaults to all of them.
+        """
+
+        fields = fields or list(self.relations)
+
+        for bdc_object in self._with_children(bdc_objects):
+            for field in fields:
+                if field in bdc_object:
+                    self.want(self.relations[field], bdc_object[field])
+
+    def _with_children(self, bdc_objects):
+        """Yields objects followed by their nested objects."""
+
+        for bdc_object in bdc_objects:
+            yield bdc_object
+
+            bdc_class = Session.type_map.get(bdc_object.get('entity'))
+            if bdc_class is None:
+                continue
+
+            for field in bdc_class.nested_map:
+                for child in bdc_object.get(field) or ():
+                    yield child
+                if isinstance(bdc_object, JSONDict):
+                    for child in bdc_object.nested_object.get(field, ()):
+                        yield child
+
+    def load(self):
+        """Fetches everything queued, in a request per `chunk_size` ids of each type."""
+
+        wanted, self._wanted = self._wanted, {}
+        if not wanted:
+            return
+
+        def fetch(item):
+            bdc_type, ids = item
+            return bdc_type, self.session.read_many(bdc_type, sorted(ids), self.chunk_size)
+
+        pool = ThreadPool(min(self.workers, len(wanted)))
+        try:
+            results = pool.map(fetch, wanted.items())
+        finally:
+            pool.terminate()
+
+        for bdc_type, found in results:
+            for id, bdc_object in found.items():
+                self.loaded[(bdc_type, id)] = bdc_object
+
+    def resolve(self, bdc_objects, fields=None):
+        """Fetches every object referred to by objects and their nested objects. See
+        :func:`want_related`.
+
+        Returns:
+            Dict of (type, id) to the object referred to, or None if it wasn't found.
+        """
+
+        bdc_objects = list(bdc_objects)
+        self.want_related(bdc_objects, fields)
+        self.load()
+
+        references = {}
+        for bdc_object in self._with_children(bdc_objects):
+            for field in fields or self.relations:
+                if bdc_object.get(field):
+                    key = (self.relations[field], bdc_object[field])
+                    references[key] = self.loaded.get(key)
+
+        return references
+
+    def get(self, bdc_type, id):
+        """Gets a loaded object, fetching it on its own if it hasn't been loaded.
+
+        Returns:
+            The Billdotcom object or None.
+        """
+
+        if (bdc_type, id) not in self.loaded:
+            self.want(bdc_type, id)
+            self.load()
+
+        return self.loaded.get((bdc_type, id))
+
+    def related(self, bdc_object, field):
+        """Gets the object a reference field of an object refers to. See :func:`get`.
+
+        Returns:
+            The Billdotcom object, or None if the field is empty or the object wasn't
+            found.
+        """
+
+        id = bdc_object.get(field)
+        if not id:
+            return None
+
+        return self.get(self.relations[field], id)
@@ -0,0 +1,417 @@
+"""
+.. module:: mirror
+   :synopsis: A local SQLite copy of Bill.com objects for offline queries.
+"""
+
+import datetime
+import decimal
+import json
+import sqlite3
+import threading
+from .collection import EntityList
+from .entityview import EntityView
+from .exceptions import BilldotcomError
+from .jsondict import JSONDict
+from .schema import Record
+from .session import Session, _format_datetime, _parse_datetime
+
+# fields kept in their own indexed columns, so queries on them are answered by SQLite
+MIRROR_COLUMNS = (
+    'externalId',
+    'vendorId',
+    'customerId',
+    'invoiceNumber',
+    'invoiceDate',
+    'dueDate',
+    'createdTime',
+    'updatedTime',
+    'isActive',
+)
+
+# filter operator -> SQL, given the column and the placeholders for the value
+_SQL_OPERATORS = {
+    '=': '{0} = ?',
+    '!=': '({0} IS NULL OR {0} != ?)',
+    '<': '{0} < ?',
+    '>': '{0} > ?',
+    '<=': '{0} <= ?',
+    '>=': '{0} >= ?',
+}
+
+
+def _plain(value):
+    """Turns a date, datetime or Decimal into the form Bill.com sends it in. Other
+    values are returned as is.
+    """
+
+    if isinstance(value, datetime.datetime):
+        return _format_datetime(_parse_datetime(value))
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+
+def _to_row(bdc_object):
+    """Gets a plain dict of fields from a Billdotcom object, view, record or row."""
+
+    if isinstance(bdc_object, Record):
+        return bdc_object.as_row()
+    if isinstance(bdc_object, EntityView):
+        return bdc_object.row
+
+    row = dict(bdc_object)
+    if isinstance(bdc_object, JSONDict):
+        row.update(bdc_object.nested_object)
+    return row
+
+
+def _encode(value):
+    """Called by the JSON encoder for anything it can't encode itself."""
+
+    if isinstance(value, (JSONDict, Record, EntityView)):
+        return _to_row(value)
+
+    plain = _plain(value)
+    if plain is value:
+        raise TypeError('{!r} is not JSON serializable'.format(value))
+    return plain
+
+
+def _matches(value, op, target):
+    """Checks a value against a filter the way the server does."""
+
+    if op == '=':
+        return value == target
+    if op == '!=':
+        return value != target
+    if op == 'in':
+        return value in target
+    if op == 'nin':
+        return value not in target
+    if value is None:
+        return False
+    if op == '<':
+        return value < target
+    if op == '>':
+        return value > target
+    if op == '<=':
+        return value <= target
+    if op == '>=':
+        return value >= target
+    raise BilldotcomError('unknown filter operator {}'.format(op))
+
+
+class SQLiteMirror(object):
+    """Keeps a copy of Bill.com objects in a local SQLite database so repeated reads and
+    reports don't need the API, and can filter and sort on any field:
+
+        >>> mirror = SQLiteMirror('/var/lib/billing/billdotcom.db')
+        >>> with Session() as s:
+        >>>     mirror.load(s, 'Bill')
+        >>>     mirror.load(s, 'Vendor')
+        >>> unpaid = mirror.query('Bill', filters=[('vendorId', '=', vendor_id), ('paymentStatus', '!=', '0')])
+
+    Use a :class:`billdotcom.sync.SyncEngine` to keep it current afterwards.
+
+    Every object type in :attr:`billdotcom.session.Session.type_map` can be stored.
+    The id and the fields in :data:`MIRROR_COLUMNS` are indexed; filters and sorts on
+    them are run by SQLite, and on any other field in Python. Queries return the same
+    Billdotcom objects as the Session. The mirror is safe to share between threads.
+
+    Args:
+        path (str): The database file. Defaults to an in-memory database.
+        typed (bool): Convert typed fields of the objects returned, as with
+            `Session(typed=True)`.
+    """
+
+    def __init__(self, path=':memory:', typed=False):
+        self.path = path
+        self.typed = typed
+
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._create_tables()
+
+    def _create_tables(self):
+        columns = ''.join('    {} TEXT,\n'.format(column) for column in MIRROR_COLUMNS)
+
+        with self._lock, self._db:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS entities (\n'
+                '    entity TEXT NOT NULL,\n'
+                '    id TEXT NOT NULL,\n'
+                + columns +
+                '    data TEXT NOT NULL,\n'
+                '    PRIMARY KEY (entity, id)\n'
+                ')'
+            )
+
+            for column in MIRROR_COLUMNS:
+                self._db.execute('CREATE INDEX IF NOT EXISTS entities_{0} ON entities (entity, {0})'.format(column))
+
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS sync_state (\n'
+                '    entity TEXT PRIMARY KEY,\n'
+                '    state TEXT NOT NULL\n'
+                ')'
+            )
+
+    def upsert(self, bdc_objects):
+        """Adds objects to the mirror, replacing any already stored with the same type
+        and id. Billdotcom objects, views, records and server response rows can be
+        mixed, and all of them are written in one transaction.
+
+        Returns:
+            The number of objects written.
+
+        Raises:
+            BilldotcomError if an object has no id or isn't of a supported type.
+        """
+
+        values = []
+
+        for bdc_object in bdc_objects:
+            row = _to_row(bdc_object)
+
+            if row.get('entity') not in Session.type_map:
+                raise BilldotcomError('object type {} is not supported'.format(row.get('entity')))
+            if not row.get('id'):
+                raise BilldotcomError('only objects with an id can be mirrored')
+
+            values.append(
+                [row['entity'], row['id']]
+                + [_plain(row.get(column)) for column in MIRROR_COLUMNS]
+                + [json.dumps(row, default=_encode)]
+            )
+
+        sql = 'INSERT OR REPLACE INTO entities VALUES ({})'.format(', '.join('?' * (len(MIRROR_COLUMNS) + 3)))
+
+        with self._lock, self._db:
+            self._db.executemany(sql, values)
+
+        return len(values)
+
+    def delete(self, bdc_type, ids):
+        """Removes objects from the mirror.
+
+        Args:
+            bdc_type: A Billdotcom object type.
+            ids: The Id fields of the objects.
+        """
+
+        with self._lock, self._db:
+            self._db.executemany(
+                'DELETE FROM entities WHERE entity = ? AND id = ?',
+                [(bdc_type, id) for id in ids]
+            )
+
+    def get(self, bdc_type, id):
+        """Gets one object from the mirror.
+
+        Returns:
+            The Billdotcom object or None.
+        """
+
+        objects = self.query(bdc_type, filters=[('id', '=', id)])
+        return objects[0] if objects else None
+
+    def count(self, bdc_type, filters=[]):
+        """Counts the objects of a type in the mirror matching the filters. When every
+        filter is on an indexed field SQLite counts them without loading any.
+
+        Returns:
+            int.
+        """
+
+        where, params, remaining = self._where(bdc_type, filters)
+
+        if remaining:
+            return len(self._query_rows(bdc_type, [], filters, 0, None))
+
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM entities WHERE ' + where, params).fetchone()[0]
+
+    def query(self, bdc_type, sort=[], filters=[], start=0, max=None, lazy=False):
+        """Lists objects from the mirror, like :func:`billdotcom.session.Session.list`
+        but without going to the server and with filters and sorts on any field.
+
+        Args:
+            bdc_type: A Billdotcom object type.
+
+            sort: A list of (field, 'asc' or 'desc') tuples. Objects are ordered by id
+                after that.
+
+            filters: A list of (field, operator, value) tuples. The operators are the
+                same as the server's: =, <, >, !=, <=, >=, in, nin. Dates, datetimes
+                and Decimals are compared the way the server sends them.
+
+            start: Index of the first object returned. Default 0.
+
+            max: The most objects returned. Default None (all of them).
+
+            lazy: Return read-only :class:`billdotcom.entityview.EntityView` objects
+                instead of full objects. Default False.
+
+        Returns:
+            :class:`billdotcom.collection.EntityList` of Billdotcom objects.
+
+        Raises:
+            BilldotcomError
+        """
+
+        rows = self._query_rows(bdc_type, sort, filters, start, max)
+
+        if self.typed and rows:
+            Session.type_map[bdc_type].schema.decode(rows)
+
+        bdc_class = Session.type_map[bdc_type]
+
+        if lazy:
+            return EntityList(EntityView(bdc_class, row) for row in rows)
+
+        objects = EntityList()
+        for row in rows:
+            bdc_object = bdc_class(**row)
+            bdc_object.mark_clean()
+            objects.append(bdc_object)
+
+        return objects
+
+    def _where(self, bdc_type, filters):
+        """Builds the SQL condition for the filters on indexed fields.
+
+        Returns:
+            The condition, its parameters, and the filters left to check in Python.
+        """
+
+        if bdc_type not in Session.type_map:
+            raise BilldotcomError('object type {} is not supported'.format(bdc_type))
+
+        indexed = set(MIRROR_COLUMNS) | set(['id'])
+
+        where = ['entity = ?']
+        params = [bdc_type]
+        # filters on fields that only exist in the JSON, checked after loading
+        remaining = []
+
+        for field, op, value in filters:
+            if op in ('in', 'nin'):
+                value = [_plain(x) for x in value]
+            else:
+                value = _plain(value)
+
+            if field not in indexed:
+                remaining.append((field, op, value))
+            elif op in ('in', 'nin'):
+                if not value:
+                    where.append('0' if op == 'in' else '1')
+                    continue
+                placeholders = ', '.join('?' * len(value))
+                if op == 'in':
+                    where.append('{} IN ({})'.format(field, placeholders))
+                else:
+                    where.append('({0} IS NULL OR {0} NOT IN ({1}))'.format(field, placeholders))
+                params.extend(value)
+            elif op in _SQL_OPERATORS:
+                where.append(_SQL_OPERATORS[op].format(field))
+                params.append(value)
+            else:
+                raise BilldotcomError('unknown filter operator {}'.format(op))
+
+        return ' AND '.join(where), params, remaining
+
+    def _query_rows(self, bdc_type, sort, filters, start, max):
+        where, params, remaining = self._where(bdc_type, filters)
+
+        indexed = set(MIRROR_COLUMNS) | set(['id'])
+        sql_sort = all(name in indexed for name, _ in sort)
+
+        sql = 'SELECT data FROM entities WHERE ' + where
+
+        if sql_sort:
+            order = ['{} {}'.format(name, 'DESC' if order == 'desc' else 'ASC') for name, order in sort]
+            sql += ' ORDER BY ' + ', '.join(order + ['id'])
+
+        paged = sql_sort and not remaining
+        if paged and (start or max is not None):
+            sql += ' LIMIT ? OFFSET ?'
+            params.extend([-1 if max is None else max, start])
+
+        with self._lock:
+            rows = [json.loads(data) for data, in self._db.execute(sql, params)]
+
+        if remaining:
+            rows = [
+                row for row in rows
+                if all(_matches(row.get(field), op, value) for field, op, value in remaining)
+            ]
+
+        if not sql_sort:
+            rows.sort(key=lambda row: row['id'])
+            # python's sort is stable, so sorting by each key from last to first gives the combined order
+            for name, order in reversed(sort):
+                rows.sort(key=lambda row: row.get(name), reverse=(order == 'desc'))
+
+        if not paged:
+            rows = rows[start:None if max is None else start + max]
+
+        return rows
+
+    def get_state(self, bdc_type):
+        """Gets the sync state saved for a type, for :class:`billdotcom.sync.SyncEngine`.
+
+        Returns:
+            Dict, or None if nothing is saved.
+        """
+
+        with self._lock:
+            row = self._db.execute('SELECT state FROM sync_state WHERE entity = ?', (bdc_type,)).fetchone()
+
+        return json.loads(row[0]) if row else None
+
+    def set_state(self, bdc_type, state):
+        """Saves the sync state for a type, for :class:`billdotcom.sync.SyncEngine`."""
+
+        with self._lock, self._db:
+            self._db.execute('INSERT OR REPLACE INTO sync_state VALUES (?, ?)', (bdc_type, json.dumps(state)))
+
+    def load(self, session, bdc_type, filters=[], page_size=999):
+        """Copies every matching object of a type from the server into the mirror, a page
+        at a time.
+
+        Args:
+            session (Session): A logged-in session.
+            bdc_type: A Billdotcom object type.
+            filters: Filters for the server. See :func:`billdotcom.session.Session.list`.
+
+        Returns:
+            The number of objects copied.
+        """
+
+        count = 0
+        page = []
+
+        for view in session.iter_list(bdc_type, filters=filters, page_size=page_size, lazy=True):
+            page.append(view)
+            if len(page) == page_size:
+                count += self.upsert(page)
+                page = []
+
+        if page:
+            count += self.upsert(page)
+
+        return count
+
+    def close(self):
+        """Closes the database."""
+
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
@@ -0,0 +1,246 @@
+"""
+.. module:: orgrouter
+   :synopsis: Routing calls to session pools for many organizations.
+"""
+
+import collections
+import contextlib
+import sys
+import threading
+from .exceptions import BilldotcomError
+from .https import Transport
+from .sessionpool import SessionPool
+
+
+class OrgRouter(object):
+    """Holds a :class:`billdotcom.sessionpool.SessionPool` for each of many organizations
+    and sends each call to the right one, so one process can work for hundreds of
+    organizations:
+
+        >>> router = OrgRouter(credentials={
+        >>>     '00802AAAAAAAAAAAAAAA': dict(email='a@example.com', password='secret'),
+        >>>     '00802BBBBBBBBBBBBBBB': dict(email='b@example.com', password='secret'),
+        >>> })
+        >>> bill = router.run('00802AAAAAAAAAAAAAAA', lambda s: s.read('Bill', bill_id))
+
+    Pools are made the first time an organization is used. Once more than `max_orgs`
+    organizations have pools, the least recently used idle ones are logged out and
+    dropped, including pools that were busy until their last lease ended. Every pool
+    shares one transport.
+
+    Args:
+        credentials: Either a dict of orgId to login details, or a function taking an
+            orgId and returning them. Login details are a dict with `email` and
+            `password`, and optionally `appkey`. Missing details come from the
+            configuration.
+        pool_size (int): Sessions held for each organization.
+        max_orgs (int): The most organizations to hold sessions for at once.
+        transport (Transport): The transport shared by every session.
+
+    Other keyword arguments are passed on to each Session.
+    """
+
+    def __init__(self, credentials=None, pool_size=2, max_orgs=100, transport=None, **kwargs):
+        self.credentials = credentials if credentials is not None else {}
+        self.pool_size = pool_size
+        self.max_orgs = max_orgs
+        self.session_kwargs = kwargs
+        self.session_kwargs['transport'] = transport or Transport(pool_maxsize=pool_size * 4)
+        # a transport made here is closed with the router
+        self._owns_transport = transport is None
+
+        # orgId -> SessionPool, least recently used first
+        self._pools = collections.OrderedDict()
+        # orgId -> number of leases out
+        self._busy = collections.Counter()
+        self._lock = threading.Lock()
+
+    def add_org(self, org_id, email=None, password=None, appkey=None):
+        """Adds or replaces the login details for an organization."""
+
+        if callable(self.credentials):
+            raise BilldotcomError('credentials are looked up by a function and cannot be added to')
+
+        self.credentials[org_id] = dict(email=email, password=password, appkey=appkey)
+
+    def _login_details(self, org_id):
+        if callable(self.credentials):
+            details = self.credentials(org_id)
+        else:
+            details = self.credentials.get(org_id)
+
+        if details is None:
+            raise BilldotcomError('no credentials for organization {}'.format(org_id))
+
+        return details
+
+    @contextlib.contextmanager
+    def lease(self, org_id, timeout=None):
+        """Borrows a logged-in session for an organization. See
+        :func:`billdotcom.sessionpool.SessionPool.lease`.
+        """
+
+        with self._lock:
+            pool = self._pools.pop(org_id, None)
+
+            if pool is None:
+                details = self._login_details(org_id)
+                kwargs = dict(self.session_kwargs)
+                kwargs.update(
+                    org_id = org_id,
+                    email = details.get('email'),
+                    password = details.get('password'),
+                    appkey = details.get('appkey')
+                )
+                pool = SessionPool(size=self.pool_size, **kwargs)
+
+            # re-insert to mark it as most recently used
+            self._pools[org_id] = pool
+            self._busy[org_id] += 1
+
+            evicted = self._evict()
+
+        for old_pool in evicted:
+            old_pool.close()
+
+        try:
+            with pool.lease(timeout) as session:
+                yield session
+        finally:
+            with self._lock:
+                self._busy[org_id] -= 1
+                if not self._busy[org_id]:
+                    del self._busy[org_id]
+
+                # pools that were busy when the lease started may be idle now
+                evicted = self._evict()
+
+            for old_pool in evicted:
+                old_pool.close()
+
+    def _evict(self):
+        """Drops the least recently used idle pools while there are too many. Must be
+        called with the lock held.
+
+        Returns:
+            The pools to close.
+        """
+
+        evicted = []
+
+        for org_id in list(self._pools):
+            if len(self._pools) <= self.max_orgs:
+                break
+            if not self._busy[org_id]:
+                evicted.append(self._pools.pop(org_id))
+
+        return evicted
+
+    def run(self, org_id, function, *args, **kwargs):
+        """Calls `function(session, *args, **kwargs)` with a session for an organization.
+
+        Returns:
+            What `function` returned.
+        """
+
+        with self.lease(org_id) as session:
+            return function(session, *args, **kwargs)
+
+    def map(self, calls, workers=8, per_org=None, return_exceptions=False):
+        """Runs calls for many organizations in parallel and waits for all of them.
+
+        Calls are taken from the organizations in turn, and no organization gets more
+        than `per_org` workers at once, so one organization with a lot of work can't
+        hold up the others:
+
+            >>> results = router.map([(org_id, lambda s: s.list('Vendor')) for org_id in org_ids])
+
+        Args:
+            calls: (orgId, function) tuples. Each function is given a Session for its
+                organization.
+            workers (int): The most calls running at once.
+            per_org (int): The most calls running at once for one organization.
+                Defaults to the pool size.
+            return_exceptions (bool): If True, a failed call's exception is put in the
+                results instead of being raised.
+
+        Returns:
+            List of the results, in the same order as `calls`.
+        """
+
+        per_org = per_org or self.pool_size
+
+        queues = collections.OrderedDict()
+        count = 0
+        for index, (org_id, function) in enumerate(calls):
+            queues.setdefault(org_id, collections.deque()).append((index, function))
+            count += 1
+
+        results = [None] * count
+        errors = []
+        running = collections.Counter()
+        condition = threading.Condition()
+
+        def next_call():
+            with condition:
+                while queues:
+                    for org_id in list(queues):
+                        if running[org_id] < per_org:
+                            queue = queues.pop(org_id)
+                            index, function = queue.popleft()
+                            if queue:
+                                # back of the line, so the other organizations get a turn
+                                queues[org_id] = queue
+                            running[org_id] += 1
+                            return org_id, index, function
+                    condition.wait()
+                return None
+
+        def worker():
+            while True:
+                call = next_call()
+                if call is None:
+                    return
+
+                org_id, index, function = call
+                try:
+                    results[index] = self.run(org_id, function)
+                except Exception as e:
+                    if return_exceptions:
+                        results[index] = e
+                    else:
+                        errors.append(sys.exc_info())
+                finally:
+                    with condition:
+                        running[org_id] -= 1
+                        condition.notify_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(min(workers, count))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise errors[0][0], errors[0][1], errors[0][2]
+
+        return results
+
+    def close(self):
+        """Logs out every organization's sessions."""
+
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), collections.OrderedDict()
+
+        for pool in pools:
+            pool.close()
+
+        if self._owns_transport:
+            self.session_kwargs['transport'].close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
@@ -0,0 +1,170 @@
+"""
+.. module:: ratelimit
+   :synopsis: Pacing requests to stay under Bill.com's API limits.
+"""
+
+import contextlib
+import json
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # no cross-process locking on this platform
+    fcntl = None
+
+
+class RateLimiter(object):
+    """Paces requests with a token bucket and caps how many are in flight at once.
+    Callers over the limit wait their turn instead of failing.
+
+    Give it to a :class:`billdotcom.https.Transport` to pace everything sent through
+    it, or to a Session to pace just that session. Bill.com's limits apply per devKey
+    and organization, so share one limiter between all the sessions for the same
+    devKey and organization:
+
+        >>> limiter = RateLimiter(rate=100, per=60, concurrency=3)
+        >>> with Session(rate_limiter=limiter) as s:
+        >>>     # do stuff
+
+    The limiter is safe to share between threads. Use :class:`FileRateLimiter` to share
+    limits between processes.
+
+    Args:
+        rate (float): Requests allowed every `per` seconds. None for no rate limit.
+        per (float): The period `rate` is measured over, in seconds.
+        burst (float): The most requests that can be sent back to back after a quiet
+            period. Defaults to `rate`.
+        concurrency (int): The most requests in flight at once. None for no limit.
+    """
+
+    def __init__(self, rate=None, per=60.0, burst=None, concurrency=None, clock=time.time, sleep=time.sleep):
+        self.rate = rate
+        self.per = per
+        self.burst = rate if burst is None else burst
+        self.concurrency = concurrency
+        self.clock = clock
+        self.sleep = sleep
+
+        self._state = dict(tokens=self.burst, updated=clock())
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(concurrency) if concurrency else None
+
+    @contextlib.contextmanager
+    def limit(self):
+        """Waits for a free slot and a token, and holds the slot until the block ends:
+
+            >>> with limiter.limit():
+            >>>     # send one request
+        """
+
+        slot = self._acquire_slot()
+        try:
+            self._take_token()
+            yield
+        finally:
+            self._release_slot(slot)
+
+    def _take_token(self):
+        if not self.rate:
+            return
+
+        with self._lock:
+            wait = self._reserve(self._state)
+
+        if wait > 0:
+            self.sleep(wait)
+
+    def _reserve(self, state):
+        """Takes a token from the bucket state, going into debt if it is empty so
+        that waiting callers are served in order.
+
+        Returns:
+            Seconds to wait before sending.
+        """
+
+        fill_rate = float(self.rate) / self.per
+        now = self.clock()
+
+        tokens = min(self.burst, state['tokens'] + (now - state['updated']) * fill_rate)
+        state['tokens'] = tokens - 1
+        state['updated'] = now
+
+        return -state['tokens'] / fill_rate
+
+    def _acquire_slot(self):
+        if self._slots:
+            self._slots.acquire()
+
+    def _release_slot(self, slot):
+        if self._slots:
+            self._slots.release()
+
+
+class FileRateLimiter(RateLimiter):
+    """A :class:`RateLimiter` whose bucket and slots live in files, so that every local
+    process using the same `path` shares the same limits:
+
+        >>> limiter = FileRateLimiter('/var/tmp/billdotcom-ORGID.limit', rate=100, concurrency=3)
+
+    The bucket is kept in `path` under an exclusive lock, and each concurrency slot is
+    a lock on one of the files `path.slot0`, `path.slot1`, and so on. Locks are released
+    by the operating system if a process dies.
+
+    Args:
+        path (str): The file to keep the limiter state in.
+        poll_interval (float): Seconds to wait between checks for a free slot.
+    """
+
+    def __init__(self, path, poll_interval=0.05, **kwargs):
+        super(FileRateLimiter, self).__init__(**kwargs)
+        self.path = path
+        self.poll_interval = poll_interval
+
+    def _take_token(self):
+        if not self.rate:
+            return
+
+        with self._lock:
+            with open(self.path, 'a+') as f:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+
+                f.seek(0)
+                try:
+                    state = json.loads(f.read())
+                except ValueError:
+                    state = dict(tokens=self.burst, updated=self.clock())
+
+                wait = self._reserve(state)
+
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+
+        if wait > 0:
+            self.sleep(wait)
+
+    def _acquire_slot(self):
+        if not self.concurrency:
+            return None
+
+        while True:
+            for number in range(self.concurrency):
+                slot = open('{}.slot{}'.format(self.path, number), 'a')
+                try:
+                    if fcntl:
+                        fcntl.flock(slot, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return slot
+                except IOError:
+                    slot.close()
+
+            self.sleep(self.poll_interval)
+
+    def _release_slot(self, slot):
+        if slot is not None:
+            if fcntl:
+                fcntl.flock(slot, fcntl.LOCK_UN)
+            slot.close()
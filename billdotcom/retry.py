@@ -0,0 +1,191 @@
+"""
+.. module:: retry
+   :synopsis: Retrying failed requests with backoff.
+"""
+
+import random
+import threading
+import time
+from .config import get_logger
+from .exceptions import HTTPError, ServerResponseError, TransportError
+
+# the kinds of failure a request can have
+SESSION_EXPIRED = 'session_expired'
+RATE_LIMITED = 'rate_limited'
+TRANSIENT = 'transient'
+PERMANENT = 'permanent'
+
+# Bill.com error codes for a session that has expired or been logged out
+SESSION_ERROR_CODES = ('BDC_1109',)
+
+# Bill.com error codes for too many requests
+RATE_LIMIT_ERROR_CODES = ('BDC_1144',)
+
+# HTTP codes worth trying again
+RATE_LIMIT_HTTP_CODES = (429,)
+TRANSIENT_HTTP_CODES = (500, 502, 503, 504)
+
+# endpoints that can be sent twice without doing anything twice
+IDEMPOTENT_PREFIXES = (
+    'Login.json',
+    'CurrentTime.json',
+    'List/',
+    'Crud/Read/',
+    'Crud/Update/',
+    'Crud/Delete/',
+    'Bulk/Crud/Read/',
+    'Bulk/Crud/Update/',
+    'Bulk/Crud/Delete/',
+)
+
+
+def is_idempotent(url):
+    """Checks if a request to an API endpoint can safely be sent again after it may
+    already have reached the server.
+    """
+    return url.startswith(IDEMPOTENT_PREFIXES)
+
+
+class RetryPolicy(object):
+    """Decides which failed requests are sent again and how long to wait in between.
+
+    Failures are classified as:
+        * session_expired: the server rejected the session id. The session logs in
+          again and the request is replayed straight away.
+        * rate_limited: the server turned the request away for going too fast.
+        * transient: the connection failed or the server had an internal error.
+        * permanent: anything else. These are never retried.
+
+    Session and rate limit failures are rejected before any work is done, so they are
+    replayed for every request. Transient failures may happen after the server acted
+    on the request, so by default they are only replayed for idempotent requests
+    (reads, lists, updates and deletes) and never for creates.
+
+    Waits use exponential backoff with full jitter. Retries are also limited by a
+    budget shared by every request using the policy: each retry spends one unit, and
+    each success earns back `budget_ratio` units, up to `budget`. This keeps a failing
+    server from being hit by a storm of retries.
+
+        >>> with Session(retry_policy=RetryPolicy(max_attempts=6, max_backoff=60)) as s:
+        >>>     # do stuff
+
+    Use `RetryPolicy(max_attempts=1)` to turn retries off.
+
+    Args:
+        max_attempts (int): The most times a request is sent.
+        backoff (float): Seconds to wait, at most, before the first retry. Doubles on
+            every retry.
+        max_backoff (float): The most seconds to wait before a retry.
+        budget (float): The most retries that can be spent before successes earn
+            more back.
+        budget_ratio (float): Retries earned back by each successful request.
+        retry_unsafe (bool): If True, transient failures of non-idempotent requests
+            are retried too.
+    """
+
+    def __init__(self, max_attempts=4, backoff=0.5, max_backoff=30.0, budget=10.0, budget_ratio=0.2,
+                 retry_unsafe=False, sleep=time.sleep, random=random.random):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = budget
+        self.budget_ratio = budget_ratio
+        self.retry_unsafe = retry_unsafe
+        self.sleep = sleep
+        self.random = random
+
+        self.session_error_codes = SESSION_ERROR_CODES
+        self.rate_limit_error_codes = RATE_LIMIT_ERROR_CODES
+
+        self._tokens = budget
+        self._lock = threading.Lock()
+
+    def classify(self, error):
+        """Works out what kind of failure an exception is.
+
+        Returns:
+            One of SESSION_EXPIRED, RATE_LIMITED, TRANSIENT or PERMANENT.
+        """
+
+        if isinstance(error, TransportError):
+            return TRANSIENT
+
+        if isinstance(error, HTTPError):
+            if error.status_code in RATE_LIMIT_HTTP_CODES:
+                return RATE_LIMITED
+            if error.status_code in TRANSIENT_HTTP_CODES:
+                return TRANSIENT
+            return PERMANENT
+
+        if isinstance(error, ServerResponseError):
+            if error.error_code in self.session_error_codes:
+                return SESSION_EXPIRED
+            if error.error_code in self.rate_limit_error_codes:
+                return RATE_LIMITED
+
+        return PERMANENT
+
+    def delay(self, retry):
+        """Gets the seconds to wait before a retry, counting from 1."""
+        return self.random() * min(self.max_backoff, self.backoff * 2 ** (retry - 1))
+
+    def call(self, send, idempotent=True, relogin=None):
+        """Calls `send` until it succeeds or the failure should not be retried.
+
+        Args:
+            send: A function that sends the request and returns the response.
+            idempotent (bool): If the request can safely be sent twice.
+            relogin: A function that logs in again, or None if an expired session
+                should not be retried.
+
+        Returns:
+            What `send` returned.
+
+        Raises:
+            The last failure.
+        """
+
+        LOG = get_logger()
+
+        attempt = 1
+        while True:
+            try:
+                result = send()
+            except (HTTPError, ServerResponseError) as e:
+                kind = self.classify(e)
+
+                if not self._should_retry(kind, attempt, idempotent, relogin):
+                    raise
+
+                LOG.warning('retrying after {} failure (attempt {} of {}): {}'.format(
+                    kind, attempt, self.max_attempts, e.message))
+
+                if kind == SESSION_EXPIRED:
+                    relogin()
+                else:
+                    self.sleep(self.delay(attempt))
+
+                attempt += 1
+            else:
+                self._earn()
+                return result
+
+    def _should_retry(self, kind, attempt, idempotent, relogin):
+        if kind == PERMANENT or attempt >= self.max_attempts:
+            return False
+        if kind == SESSION_EXPIRED and relogin is None:
+            return False
+        if kind == TRANSIENT and not (idempotent or self.retry_unsafe):
+            return False
+        return self._spend()
+
+    def _spend(self):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def _earn(self):
+        with self._lock:
+            self._tokens = min(self.budget, self._tokens + self.budget_ratio)
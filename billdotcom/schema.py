@@ -0,0 +1,356 @@
+"""
+.. module:: schema
+   :synopsis: Per-entity field declarations and a compact record built on them.
+"""
+
+import collections
+import copy
+import datetime
+import decimal
+import re
+import iso8601
+from .exceptions import BilldotcomError
+
+# Bill.com field data types
+ID = 'ID'
+STRING = 'String'
+NUMBER = 'Number'
+DATE = 'Date'
+DATETIME = 'DateTime'
+ENUM = 'Enum'
+BOOLEAN = 'Boolean'
+NESTED = 'Nested'
+
+# labels for enum codes used by every entity
+ENUM_LABELS = {
+    'isActive': {'1': 'Active', '2': 'Inactive'},
+}
+
+# entity name -> Schema, for rebuilding pickled records
+SCHEMAS = {}
+
+# marks a field that isn't set in a record
+_MISSING = object()
+
+
+class EnumValue(unicode):
+    """An enum code from the server, which still compares and encodes as the code
+    but also knows its label:
+
+        >>> bill['isActive'] == '1', bill['isActive'].label
+        (True, 'Active')
+    """
+
+    def __new__(cls, value, labels):
+        self = super(EnumValue, cls).__new__(cls, value)
+        self.labels = labels
+        return self
+
+    @property
+    def label(self):
+        """The name of the code, or None if it isn't known."""
+        return self.labels.get(self)
+
+    def __reduce__(self):
+        return EnumValue, (unicode(self), self.labels)
+
+
+# the way Bill.com sends DateTime fields, parsed without iso8601 when it matches
+_DATETIME = re.compile(r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.(\d{1,6}))?\+0000$')
+
+
+def _decode_date(value):
+    if not isinstance(value, basestring):
+        return value
+    return datetime.date(int(value[0:4]), int(value[5:7]), int(value[8:10]))
+
+
+def _decode_datetime(value):
+    if not isinstance(value, basestring):
+        return value
+
+    match = _DATETIME.match(value)
+    if match is None:
+        return iso8601.parse_date(value)
+
+    year, month, day, hour, minute, second, fraction = match.groups()
+    microsecond = int(fraction.ljust(6, '0')) if fraction else 0
+    return datetime.datetime(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                             microsecond, iso8601.UTC)
+
+
+def _decode_number(value):
+    if isinstance(value, float):
+        # repr is the shortest string that reads back as the same float
+        return decimal.Decimal(repr(value))
+    if isinstance(value, (int, long, basestring)):
+        return decimal.Decimal(value)
+    return value
+
+
+# data type -> function turning a value from the server into a Python type
+DECODERS = {
+    DATE: _decode_date,
+    DATETIME: _decode_datetime,
+    NUMBER: _decode_number,
+}
+
+
+class Schema(object):
+    """Describes an entity once for its class: the fields it has and their Bill.com data
+    types, the fields required to create it, and the nested lists of child objects it
+    holds. Billdotcom classes keep theirs in a `schema` attribute:
+
+        >>> Bill.schema.types['invoiceDate']
+        'Date'
+
+    Fields that aren't declared are still accepted everywhere; they just aren't
+    stored as compactly.
+
+    Args:
+        name (str): The entity name.
+        fields: (name, data type) tuples.
+        required: The names of the fields required to create the entity.
+        nested (dict): Field name to the Billdotcom class of the objects in it.
+        enums (dict): Enum field name to a dict of its codes' labels, on top of
+            :data:`ENUM_LABELS`.
+    """
+
+    def __init__(self, name, fields, required=(), nested=None, enums=None):
+        self.name = name
+        self.required = tuple(required)
+        self.nested = dict(nested or {})
+        self.enums = dict(ENUM_LABELS, **(enums or {}))
+
+        types = collections.OrderedDict(fields)
+        for field in self.nested:
+            types.setdefault(field, NESTED)
+
+        self.types = types
+        self.fields = tuple(types)
+        self.index = dict((field, i) for i, field in enumerate(self.fields))
+
+        # compiled on first use, since nested classes' schemas may not exist yet
+        self._decoders = None
+
+        SCHEMAS[name] = self
+
+    def __repr__(self):
+        return 'Schema({0!r})'.format(self.name)
+
+    @property
+    def decoders(self):
+        """(field, function) pairs for the fields :func:`decode` converts."""
+
+        if self._decoders is None:
+            decoders = []
+
+            for field, data_type in self.types.items():
+                if data_type == NESTED:
+                    decoders.append((field, self.nested[field].schema._decode_children))
+                elif data_type == ENUM and field in self.enums:
+                    labels = self.enums[field]
+                    decoders.append((field, lambda value, labels=labels: EnumValue(value, labels)))
+                elif data_type in DECODERS:
+                    decoders.append((field, DECODERS[data_type]))
+
+            self._decoders = tuple(decoders)
+
+        return self._decoders
+
+    def decode(self, rows):
+        """Converts the typed fields of server response rows in place, in one pass over
+        them: Dates become `date`, DateTimes timezone-aware `datetime`, Numbers
+        `Decimal` and enums with known codes :class:`EnumValue`. Nested objects are
+        decoded too. Values that are already converted are left alone, and values
+        that can't be converted are kept as they are.
+
+        Args:
+            rows: Dicts of the entity's fields.
+
+        Returns:
+            The rows.
+        """
+
+        decoders = self.decoders
+
+        for row in rows:
+            for field, decode in decoders:
+                value = row.get(field)
+                if value is None or value == '':
+                    continue
+                try:
+                    row[field] = decode(value)
+                except (ValueError, TypeError, decimal.InvalidOperation, iso8601.ParseError):
+                    pass
+
+        return rows
+
+    def _decode_children(self, children):
+        if isinstance(children, list):
+            self.decode(child for child in children if isinstance(child, dict))
+        return children
+
+    def record(self, row):
+        """Builds a compact :class:`Record` from a dict of fields, such as a server
+        response row or a Billdotcom object. Nested objects become records too. The
+        row isn't changed or kept.
+
+        Returns:
+            Record.
+        """
+
+        values = [_MISSING] * len(self.fields)
+        extra = None
+
+        for key, value in row.items():
+            if key == 'entity':
+                continue
+
+            child_class = self.nested.get(key)
+            if child_class is not None and isinstance(value, (list, tuple)):
+                value = tuple(
+                    child if isinstance(child, Record) else child_class.schema.record(child)
+                    for child in value
+                )
+            elif isinstance(value, (list, dict)):
+                value = copy.deepcopy(value)
+
+            i = self.index.get(key)
+            if i is not None:
+                values[i] = value
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+
+        return Record(self, values, extra)
+
+
+def _record(name, row):
+    """Rebuilds a pickled record."""
+    return SCHEMAS[name].record(row)
+
+
+class Record(collections.MutableMapping):
+    """A Billdotcom object's fields stored compactly in a list laid out by its
+    :class:`Schema`, for holding many objects in memory at once, such as in a cache.
+    It takes a fraction of the memory of a full object and has the same dict-like
+    interface, but none of its checks or change tracking.
+
+        >>> record = bill.compact()
+        >>> record['invoiceNumber']
+        'BC1234'
+        >>> bill = Bill(**record.as_row())
+
+    Records are made with :func:`Schema.record` or
+    :func:`billdotcom.jsondict.JSONDict.compact`.
+    """
+
+    __slots__ = ('schema', '_values', '_extra')
+
+    def __init__(self, schema, values, extra=None):
+        self.schema = schema
+        self._values = values
+        # fields the schema doesn't declare
+        self._extra = extra
+
+    @property
+    def name(self):
+        return self.schema.name
+
+    @property
+    def url(self):
+        return self.schema.name + '.json'
+
+    def __getitem__(self, key):
+        key = str(key)
+
+        if key == 'entity':
+            return self.schema.name
+
+        i = self.schema.index.get(key)
+        if i is not None:
+            value = self._values[i]
+            if value is _MISSING:
+                raise KeyError(key)
+            return value
+
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        key = str(key)
+
+        if key == 'entity':
+            if value != self.schema.name:
+                raise BilldotcomError('cannot change a {} record into a {}'.format(self.schema.name, value))
+            return
+
+        i = self.schema.index.get(key)
+        if i is not None:
+            self._values[i] = value
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        key = str(key)
+
+        i = self.schema.index.get(key)
+        if i is not None and self._values[i] is not _MISSING:
+            self._values[i] = _MISSING
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        yield 'entity'
+
+        for field, value in zip(self.schema.fields, self._values):
+            if value is not _MISSING:
+                yield field
+
+        if self._extra is not None:
+            for key in self._extra:
+                yield key
+
+    def __len__(self):
+        count = sum(1 for value in self._values if value is not _MISSING) + 1
+        if self._extra is not None:
+            count += len(self._extra)
+        return count
+
+    def __repr__(self):
+        return 'Record({0!r})'.format(self.as_row())
+
+    def __reduce__(self):
+        return _record, (self.schema.name, self.as_row())
+
+    def as_row(self):
+        """Builds a plain dict of the fields, like a server response row. Nested
+        records become dicts, and nothing is shared with the record.
+
+        Returns:
+            dict.
+        """
+
+        row = {}
+        nested = self.schema.nested
+
+        for key in self:
+            value = self[key]
+            if key in nested and isinstance(value, tuple):
+                value = [child.as_row() if isinstance(child, Record) else child for child in value]
+            elif isinstance(value, (list, dict)):
+                value = copy.deepcopy(value)
+            row[key] = value
+
+        return row
+
+    def for_json(self):
+        """Gets the fields, for :func:`billdotcom.serializer.dumps`."""
+        return dict(self)
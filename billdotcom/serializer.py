@@ -0,0 +1,73 @@
+"""
+.. module:: serializer
+   :synopsis: Encoding Billdotcom objects to JSON in a single pass.
+"""
+
+import datetime
+import decimal
+import time
+
+try:
+    # simplejson's C encoder is faster than the standard library's on Python 2
+    import simplejson as json
+    JSON_OPTIONS = dict(use_decimal=False)
+except ImportError:
+    import json
+    JSON_OPTIONS = {}
+
+# the local UTC offset, worked out once instead of for every date
+TIMEZONE = '{:+06.2f}'.format(time.timezone / 3600.0)
+
+
+def format_value(value):
+    """Formats a date, datetime or Decimal for Bill.com. Other values are returned as is."""
+
+    if isinstance(value, datetime.date):
+        # needs to be in iso8601
+        timezone = TIMEZONE
+        if isinstance(value, datetime.datetime) and value.utcoffset() is not None:
+            # keep the offset of datetimes decoded from the server
+            offset = value.utcoffset()
+            timezone = '{:+06.2f}'.format((offset.days * 86400 + offset.seconds) / 3600.0)
+        return '{:%Y-%m-%dT%H:%M:%S}'.format(value) + timezone
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+
+def _default(value):
+    """Called by the JSON encoder for anything it can't encode itself."""
+
+    for_json = getattr(value, 'for_json', None)
+    if for_json is not None:
+        return for_json()
+
+    formatted = format_value(value)
+    if formatted is value:
+        raise TypeError('{!r} is not JSON serializable'.format(value))
+    return formatted
+
+
+def dumps(data, sort_keys=False):
+    """Encodes request data as a JSON string in one walk over it. Billdotcom objects,
+    including nested ones, dates, datetimes and Decimals can appear anywhere and are
+    formatted as they are reached, without copying anything first.
+
+    Returns:
+        str.
+    """
+    return json.dumps(data, default=_default, sort_keys=sort_keys, **JSON_OPTIONS)
+
+
+def set_backend(module, **options):
+    """Replaces the JSON module used by :func:`dumps`. It must provide a `dumps` that
+    takes `default` and `sort_keys` arguments like the standard library's.
+
+    Args:
+        module: The JSON module.
+        options: Extra keyword arguments to pass to its `dumps`.
+    """
+
+    global json, JSON_OPTIONS
+    json = module
+    JSON_OPTIONS = options
@@ -12,21 +12,158 @@ from .item import Item
 from .vendor import Vendor
 from .vendorcredit import VendorCredit
 from .config import CONFIG
-from .https import https_post
+from .https import https_post, https_post_stream, get_status_and_message, Transport
+from .coalesce import is_read_only
+from .collection import EntityList
+from .entityview import EntityView
 from .exceptions import BilldotcomError, ServerResponseError
-import copy
-import json
+from .retry import RetryPolicy, is_idempotent
+from .serializer import dumps
+from multiprocessing.pool import ThreadPool
+import datetime
+import Queue
+import sys
+import threading
+
+
+# markers for what the prefetch worker hands back
+_PAGE, _ERROR, _DONE = range(3)
+
+def _prefetch(pages, depth):
+    """Consumes an iterator on a background thread, keeping up to `depth` items
+    ready ahead of the caller. Errors are raised to the caller after every item
+    fetched before the failure has been consumed.
+    """
+
+    queue = Queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Queue.Full:
+                pass
+        return False
+
+    def worker():
+        try:
+            for page in pages:
+                if not put((_PAGE, page)):
+                    return
+        except Exception:
+            put((_ERROR, sys.exc_info()))
+        else:
+            put((_DONE, None))
+
+    thread = threading.Thread(target=worker, name='billdotcom-prefetch')
+    thread.daemon = True
+    thread.start()
+
+    try:
+        while True:
+            kind, value = queue.get()
+            if kind == _DONE:
+                break
+            if kind == _ERROR:
+                raise value[0], value[1], value[2]
+            yield value
+    finally:
+        # let the worker go if the caller stops iterating early
+        stop.set()
+
+
+def _parse_datetime(value):
+    """Turns a date, datetime or ISO 8601 string into a naive UTC datetime."""
+
+    if isinstance(value, basestring):
+        value = iso8601.parse_date(value)
+    elif not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+
+    if value.utcoffset() is not None:
+        value = (value - value.utcoffset()).replace(tzinfo=None)
+
+    return value
+
+
+def _format_datetime(value):
+    """Formats a naive UTC datetime the way Bill.com sends DateTime fields."""
+    return value.strftime('%Y-%m-%dT%H:%M:%S.') + '{:03d}+0000'.format(value.microsecond // 1000)
+
+
+def _sort_objects(objects, sort):
+    """Sorts objects in place by a list of (field, 'asc' or 'desc') tuples."""
+
+    # python's sort is stable, so sorting by each key from last to first gives the
+    # combined order, even when the keys mix ascending and descending
+    for name, order in reversed(sort):
+        objects.sort(key=lambda obj: obj.get(name), reverse=(order == 'desc'))
+
 
 class Session(object):
     """This models and handles serialization of the Bill object.
 
     Your configuration should have the minimum requirements listed in :mod:`billdotcom.config`.
-    Sessions will time out after 35 minutes.
+    Sessions will time out after 35 minutes. The organization and login details can also
+    be passed in, which overrides the configuration:
+
+        >>> with Session(org_id='00802ABCDEFGHIJKLMN', email='me@example.com', password='secret'):
+        >>>     # do stuff
 
     You can use it in a with statement:
 
         >>> with Session():
         >>>     # do stuff
+
+    Each session sends its requests through a pooled, keep-alive
+    :class:`billdotcom.https.Transport`. A session makes its own unless one is passed
+    in, and closes it at the end of the with statement. Pass one in to share it
+    between sessions and threads, or to tune its pool size and timeouts:
+
+        >>> transport = Transport(pool_maxsize=20, timeout=30)
+        >>> with Session(transport=transport) as s:
+        >>>     # do stuff
+
+    Reads can be served from a cache such as :class:`billdotcom.cache.EntityCache`.
+    Updates and deletes sent through the session invalidate the cached objects when they
+    are sent and again once they finish, so reads running alongside them aren't kept:
+
+        >>> with Session(cache=EntityCache(maxsize=5000, ttl=600)) as s:
+        >>>     # do stuff
+
+    Logins can be shared through a :class:`billdotcom.tokenstore.SessionStore`, so short
+    jobs reuse a session id that is still valid instead of logging in and out each time:
+
+        >>> with Session(token_store=FileSessionStore('/var/tmp/billdotcom-sessions.json')) as s:
+        >>>     # do stuff
+
+    Failed requests are retried according to a :class:`billdotcom.retry.RetryPolicy`.
+    By default an expired session logs in again and replays the request, and rate
+    limited or transient failures are retried with backoff unless that could create
+    an object twice.
+
+    Requests can be paced with a :class:`billdotcom.ratelimit.RateLimiter`, either on
+    the session or on its transport. Callers over the limit wait instead of failing:
+
+        >>> limiter = FileRateLimiter('/var/tmp/billdotcom.limit', rate=100, per=60, concurrency=3)
+        >>> with Session(rate_limiter=limiter) as s:
+        >>>     # do stuff
+
+    A session can be shared between threads, but Bill.com works through the requests
+    of one session id one at a time. Use a :class:`billdotcom.sessionpool.SessionPool`
+    to spread threads over several logged-in sessions. Identical reads sent from many
+    threads at once can share one request through a
+    :class:`billdotcom.coalesce.RequestCoalescer`.
+
+    With `typed` set, objects read from the server have their Date, DateTime, Number
+    and known enum fields converted to `date`, `datetime`, `Decimal` and
+    :class:`billdotcom.schema.EnumValue`, a page at a time, using each class's
+    :class:`billdotcom.schema.Schema`:
+
+        >>> with Session(typed=True) as s:
+        >>>     overdue = [bill for bill in s.list('Bill') if bill['dueDate'] < date.today()]
     """
 
     type_map = {
@@ -39,25 +176,98 @@ class Session(object):
         'VendorCredit': VendorCredit
     }
 
-    def __init__(self, session_id=None):
+    # the most objects Bill.com accepts in one Bulk request
+    bulk_max = 100
+
+    def __init__(self, session_id=None, transport=None, cache=None, token_store=None, retry_policy=None,
+                 rate_limiter=None, org_id=None, email=None, password=None, appkey=None, coalescer=None,
+                 typed=False):
         self.session_id = session_id
-        self.appkey = CONFIG.get('authentication', 'appkey')
+        self.appkey = appkey or CONFIG.get('authentication', 'appkey')
+
+        # login details that override the configuration, for working with several organizations
+        self.org_id = org_id
+        self.email = email
+        self.password = password
+
+        self.transport = transport or Transport()
+        # a transport made here is closed with the session; one passed in belongs to the caller
+        self._owns_transport = transport is None
+        self.cache = cache
+        self.token_store = token_store
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.coalescer = coalescer
+        self.typed = typed
+
+        # guards logging in and out, so a session can be shared between threads
+        self._lock = threading.RLock()
 
     def post(self, url, data={}, **kwargs):
+        if kwargs:
+            data = dict(data, **kwargs)
+
+        return self._request(url, data)
+
+    def _request(self, url, data, stream=False):
+        """Sends request data with retries, logging in again if the session id is rejected.
+
+        Args:
+            stream (bool): If True, send with :func:`billdotcom.https.https_post_stream`
+                and return an iterator over the response rows. Only sending the request
+                and its status are retried; the rows are read as they are consumed.
+        """
+
         if not self.session_id:
             raise BilldotcomError("cannot send POST request without logging in first")
 
-        payload = dict(
-            devKey = self.appkey,
-            sessionId = self.session_id
-        )
+        encoded = dumps(data)
+
+        # the session id each attempt was sent with
+        sent_with = [None]
+
+        def send():
+            # built on every attempt, since the session id changes if we log in again
+            sent_with[0] = self.session_id
+            payload = dict(
+                devKey = self.appkey,
+                sessionId = sent_with[0],
+                data = encoded
+            )
+            send_payload = https_post_stream if stream else https_post
+            return send_payload(url, payload, transport=self.transport, rate_limiter=self.rate_limiter)
+
+        def relogin():
+            self._relogin(sent_with[0])
+
+        if url == 'Logout.json':
+            relogin = None
 
-        data = copy.deepcopy(data)
-        data.update(kwargs)
+        def call():
+            return self.retry_policy.call(send, idempotent=is_idempotent(url), relogin=relogin)
 
-        payload['data'] = json.dumps(data)
+        # a stream can only be read once, so it can't be shared
+        if self.coalescer is None or stream or not is_read_only(url):
+            return call()
 
-        return https_post(url, payload)
+        key = (self.appkey, self._login_data()['orgId'], url, dumps(data, sort_keys=True))
+        return self.coalescer.call(key, call)
+
+    def _relogin(self, rejected_session_id):
+        """Logs in again after the server rejected our session id. If another thread
+        has already logged in again since, its session id is used instead.
+        """
+
+        with self._lock:
+            if self.session_id != rejected_session_id:
+                return
+
+            if self.token_store is not None:
+                data = self._login_data()
+                key = self.token_store.key(data['devKey'], data['orgId'], data['userName'])
+                self.token_store.delete(key, rejected_session_id)
+
+            self.login()
 
     def getcurrenttime(self):
         """Gets Bill.com's system time.
@@ -83,7 +293,7 @@ class Session(object):
 
         url = bdc_object.url
         data = dict(
-            obj = bdc_object.data
+            obj = bdc_object
         )
 
         response = self.post('Crud/Create/' + url, data)
@@ -114,19 +324,73 @@ class Session(object):
         if bdc_type not in self.type_map:
             raise BilldotcomError('object type {} is not supported'.format(bdc_type))
 
+        cached = self._cache_get(bdc_type, id)
+        if cached is not None:
+            return cached
+
         data = dict(
             id = id
         )
 
         try:
             response = self.post('Crud/Read/' + bdc_type + '.json', data)
-            return self.type_map[response['entity']](**response)
         except ServerResponseError:
             return None
 
+        self._cache_set(response)
+        self._decode([response])
+        return self._hydrate(response)
+
+    def read_many(self, bdc_type, ids, chunk_size=100):
+        """Reads (gets) many Billdotcom objects of the same type from the server by id. The ids
+        are sent as `id in [...]` filters to the List API, `chunk_size` at a time, so N lookups
+        take about N / chunk_size requests.
+
+        For example:
+            >>> with Session() as s:
+            >>>     vendors = s.read_many('Vendor', [bill['vendorId'] for bill in bills])
+
+        Args:
+            bdc_type: A Billdotcom object type. See :func:`read` for the supported types.
+
+            ids: The Id fields of the objects. Duplicates are only fetched once.
+
+            chunk_size: Ids sent per request. Default 100, at most 999 (server maximum).
+
+        Returns:
+            Dict of id to Billdotcom object, or None for ids that were not found.
+
+        Raises:
+            BilldotcomError, ServerResponseError
+        """
+
+        if not 0 < chunk_size <= 999:
+            raise BilldotcomError('chunk size must be between 1 and 999, got {}'.format(chunk_size))
+
+        unique_ids = []
+        found = {}
+        for id in ids:
+            if id not in found:
+                found[id] = self._cache_get(bdc_type, id)
+                if found[id] is None:
+                    unique_ids.append(id)
+
+        for offset in range(0, len(unique_ids), chunk_size):
+            chunk = unique_ids[offset:offset + chunk_size]
+            rows = self._list_rows(bdc_type, [], [('id', 'in', chunk)], 0, len(chunk))
+            for row in rows:
+                self._cache_set(row)
+            for row in self._decode(rows):
+                found[row['id']] = self._hydrate(row)
+
+        return found
+
     def update(self, bdc_object):
         """Updates a Billdotcom object on the server. The id field is required.
 
+        For objects read from the server only the changed fields are sent, along with
+        the required ones, and nothing is sent at all if no field has changed.
+
         Args:
             bdc_object: A Billdotcom object with the required fields filled in.
 
@@ -137,12 +401,23 @@ class Session(object):
         if 'id' not in bdc_object:
             raise BilldotcomError('the id field is required for updates')
 
+        if bdc_object.tracked and not bdc_object.changed:
+            return
+
         url = bdc_object.url
         data = dict(
-            obj = bdc_object.data
+            obj = bdc_object.delta
         )
 
-        self.post('Crud/Update/' + url, data)
+        self._cache_delete(bdc_object.name, bdc_object['id'])
+        try:
+            self.post('Crud/Update/' + url, data)
+        finally:
+            # a read running alongside the write may have cached the old object
+            self._cache_delete(bdc_object.name, bdc_object['id'])
+
+        if bdc_object.tracked:
+            bdc_object.mark_clean()
 
     def delete(self, bdc_type, id):
         """Deletes (deactivates) a Billdotcom object on the server.
@@ -170,9 +445,240 @@ class Session(object):
             id = id
         )
 
-        self.post('Crud/Delete/' + bdc_type + '.json', data)
+        self._cache_delete(bdc_type, id)
+        try:
+            self.post('Crud/Delete/' + bdc_type + '.json', data)
+        finally:
+            self._cache_delete(bdc_type, id)
+
+    def bulk_create(self, bdc_objects):
+        """Creates many Billdotcom objects on the server, packing up to :attr:`bulk_max` objects
+        into each request. Objects of different types can be mixed.
+
+        Args:
+            bdc_objects: A list of Billdotcom objects with the required fields filled in.
+
+        Returns:
+            A list in the same order as `bdc_objects` holding either the newly created
+            object's ID or the ServerResponseError for that object.
+
+        Raises:
+            ServerResponseError when a whole request fails.
+        """
+
+        results = self._bulk_objects('Create', bdc_objects)
+        return [
+            result if isinstance(result, ServerResponseError) else result['id']
+            for result in results
+        ]
+
+    def bulk_read(self, bdc_type, ids):
+        """Reads (gets) many Billdotcom objects of the same type from the server, packing up
+        to :attr:`bulk_max` ids into each request.
+
+        Args:
+            bdc_type: A Billdotcom object type. See :func:`read` for the supported types.
+
+            ids: A list of the Id fields of the objects.
+
+        Returns:
+            A list in the same order as `ids` holding the Billdotcom object, or None when
+            it could not be read.
+
+        Raises:
+            BilldotcomError, ServerResponseError when a whole request fails.
+        """
+
+        results = self._bulk_ids('Read', bdc_type, ids)
+        self._decode([result for result in results if not isinstance(result, ServerResponseError)])
+        return [
+            None if isinstance(result, ServerResponseError) else self._hydrate(result)
+            for result in results
+        ]
+
+    def bulk_update(self, bdc_objects):
+        """Updates many Billdotcom objects on the server, packing up to :attr:`bulk_max`
+        objects into each request. The id field is required on every object.
+
+        Only changed fields are sent, as with :func:`update`, and unchanged objects are
+        left out of the requests.
+
+        Args:
+            bdc_objects: A list of Billdotcom objects with the required fields filled in.
+
+        Returns:
+            A list in the same order as `bdc_objects` holding None for each object that was
+            updated, or the ServerResponseError for that object.
+
+        Raises:
+            BilldotcomError, ServerResponseError when a whole request fails.
+        """
+
+        for bdc_object in bdc_objects:
+            if 'id' not in bdc_object:
+                raise BilldotcomError('the id field is required for updates')
+
+        results = [None] * len(bdc_objects)
+
+        changed = [
+            index for index, bdc_object in enumerate(bdc_objects)
+            if not bdc_object.tracked or bdc_object.changed
+        ]
+
+        for index in changed:
+            self._cache_delete(bdc_objects[index].name, bdc_objects[index]['id'])
+
+        try:
+            sent = self._bulk_objects('Update', [bdc_objects[index] for index in changed], delta=True)
+        finally:
+            # a read running alongside the writes may have cached the old objects
+            for index in changed:
+                self._cache_delete(bdc_objects[index].name, bdc_objects[index]['id'])
+
+        for index, result in zip(changed, sent):
+            if isinstance(result, ServerResponseError):
+                results[index] = result
+            elif bdc_objects[index].tracked:
+                bdc_objects[index].mark_clean()
+
+        return results
+
+    def bulk_delete(self, bdc_type, ids):
+        """Deletes (deactivates) many Billdotcom objects of the same type on the server,
+        packing up to :attr:`bulk_max` ids into each request.
+
+        Args:
+            bdc_type: A Billdotcom object type. See :func:`delete` for the supported types.
+
+            ids: A list of the Id fields of the objects.
+
+        Returns:
+            A list in the same order as `ids` holding None for each object that was
+            deleted, or the ServerResponseError for that object.
+
+        Raises:
+            BilldotcomError, ServerResponseError when a whole request fails.
+        """
+
+        for id in ids:
+            self._cache_delete(bdc_type, id)
+
+        try:
+            results = self._bulk_ids('Delete', bdc_type, ids)
+        finally:
+            for id in ids:
+                self._cache_delete(bdc_type, id)
+        return [
+            result if isinstance(result, ServerResponseError) else None
+            for result in results
+        ]
+
+    def _hydrate(self, row, lazy=False):
+        """Builds a Billdotcom object from a server response row and starts tracking
+        changes to it, or wraps the row in a read-only view if `lazy` is set.
+        """
+
+        if lazy:
+            return EntityView(self.type_map[row['entity']], row)
 
-    def list(self, bdc_type, sort=[], filters=[], start=0, max=999):
+        bdc_object = self.type_map[row['entity']](**row)
+        bdc_object.mark_clean()
+        return bdc_object
+
+    def _decode(self, rows):
+        """Converts the typed fields of a page of server response rows in place if the
+        session is typed. The rows must all be of the same type.
+
+        Returns:
+            The rows.
+        """
+
+        if self.typed and rows:
+            self.type_map[rows[0]['entity']].schema.decode(rows)
+
+        return rows
+
+    def _cache_get(self, bdc_type, id):
+        """Builds an object from the cache, or returns None on a miss."""
+
+        if self.cache is None:
+            return None
+
+        record = self.cache.get((bdc_type, id))
+        if record is None:
+            return None
+
+        # as_row hands out a copy, so callers can't change what is cached
+        row = record.as_row()
+        self._decode([row])
+        return self._hydrate(row)
+
+    def _cache_set(self, row):
+        """Caches a server response row as a compact record."""
+
+        if self.cache is not None:
+            schema = self.type_map[row['entity']].schema
+            self.cache.set((row['entity'], row['id']), schema.record(row))
+
+    def _cache_delete(self, bdc_type, id):
+        """Invalidates a cached object."""
+
+        if self.cache is not None:
+            self.cache.delete((bdc_type, id))
+
+    def _bulk_objects(self, operation, bdc_objects, delta=False):
+        """Sends objects to a Bulk/Crud endpoint, grouped by type. Results keep input order.
+        With `delta`, only the changes to each object are sent.
+        """
+
+        results = [None] * len(bdc_objects)
+
+        by_url = {}
+        for index, bdc_object in enumerate(bdc_objects):
+            by_url.setdefault(bdc_object.url, []).append(index)
+
+        for url, indexes in by_url.items():
+            if delta:
+                items = [dict(obj=bdc_objects[index].delta) for index in indexes]
+            else:
+                items = [dict(obj=bdc_objects[index]) for index in indexes]
+            for index, result in zip(indexes, self._bulk(operation, url, items)):
+                results[index] = result
+
+        return results
+
+    def _bulk_ids(self, operation, bdc_type, ids):
+        """Sends ids to a Bulk/Crud endpoint. Results keep input order."""
+
+        if bdc_type not in self.type_map:
+            raise BilldotcomError('object type {} is not supported'.format(bdc_type))
+
+        return self._bulk(operation, bdc_type + '.json', [dict(id=id) for id in ids])
+
+    def _bulk(self, operation, url, items):
+        """Posts items to Bulk/Crud/<operation>/<url> in chunks of :attr:`bulk_max`.
+
+        Returns:
+            A list with the response data of each item, or a ServerResponseError for the
+            items the server rejected.
+        """
+
+        results = []
+
+        for offset in range(0, len(items), self.bulk_max):
+            chunk = items[offset:offset + self.bulk_max]
+            response = self.post('Bulk/Crud/{}/{}'.format(operation, url), dict(bulkList=chunk))
+
+            for item in response:
+                status, message = get_status_and_message(item)
+                if status:
+                    results.append(ServerResponseError(message, item['response_data'].get('error_code')))
+                else:
+                    results.append(item['response_data'])
+
+        return results
+
+    def list(self, bdc_type, sort=[], filters=[], start=0, max=999, lazy=False):
         """Lists Billdotcom objects on the server, with optional filters.
         The objects will be transformed into the corresponding classes and returned.
 
@@ -203,13 +709,229 @@ class Session(object):
 
             max: Maximum records returned. Default 999 (server maximum).
 
+            lazy: If True, return read-only :class:`billdotcom.entityview.EntityView`
+                objects over the rows instead of full objects. Default False.
+
+        Returns:
+            :class:`billdotcom.collection.EntityList` of objects from the server.
+
+        Raises:
+            BilldotcomError, ServerResponseError
+        """
+
+        rows = self._decode(self._list_rows(bdc_type, sort, filters, start, max))
+
+        return EntityList(self._hydrate(row, lazy) for row in rows)
+
+    def iter_list(self, bdc_type, sort=[], filters=[], page_size=999, prefetch=0, stream=False, lazy=False):
+        """Iterates over every matching Billdotcom object on the server, with optional filters.
+        Pages are fetched lazily as the iterator is consumed and objects are yielded one at a
+        time, so memory use is bounded by the page size no matter how many objects match.
+
+        With `prefetch` set, up to that many pages are fetched ahead on a background thread
+        while the caller works through the current one, so network round-trips overlap with
+        processing. Memory is then bounded by `prefetch + 1` pages.
+
+        With `stream` set, each page is decoded from the socket as it arrives and rows are
+        yielded as soon as they have been read, so memory stays near one row rather than one
+        page. Streaming can't be combined with `prefetch`. If the connection fails part way
+        through a page the error is raised from the iterator, after the rows already read.
+
+        For example, to walk the whole Bill history:
+            >>> with Session() as s:
+            >>>     for bill in s.iter_list('Bill', sort=[('createdTime', 'asc')]):
+            >>>         print bill['id']
+
+        Args:
+            bdc_type: A Billdotcom object type. See :func:`list` for the supported types.
+
+            sort: A list of tuples representing sort order. See :func:`list`.
+
+            filters: A list of tuples representing filters to query with. See :func:`list`.
+
+            page_size: Records fetched per request. Default 999 (server maximum).
+
+            prefetch: Number of pages to fetch ahead in the background. Default 0 (off).
+
+            stream: Decode each page incrementally instead of all at once. Default False.
+
+            lazy: Yield read-only views over the rows instead of full objects. See
+                :func:`list`. Default False.
+
+        Yields:
+            Objects from the server. Iteration stops after the first short page.
+
+        Raises:
+            BilldotcomError, ServerResponseError
+        """
+
+        if not 0 < page_size <= 999:
+            raise BilldotcomError('page size must be between 1 and 999, got {}'.format(page_size))
+
+        if prefetch < 0:
+            raise BilldotcomError('prefetch must not be negative, got {}'.format(prefetch))
+
+        if stream:
+            if prefetch:
+                raise BilldotcomError('stream and prefetch cannot be used together')
+            return self._iter_stream(bdc_type, sort, filters, page_size, lazy)
+
+        return self._iter_list(bdc_type, sort, filters, page_size, prefetch, lazy)
+
+    def _iter_list(self, bdc_type, sort, filters, page_size, prefetch, lazy):
+        pages = self._iter_pages(bdc_type, sort, filters, page_size)
+        if prefetch:
+            pages = _prefetch(pages, prefetch)
+
+        for rows in pages:
+            self._decode(rows)
+
+            # hand rows out one by one, dropping each raw row once it has been converted
+            rows.reverse()
+            while rows:
+                row = rows.pop()
+                yield self._hydrate(row, lazy)
+
+    def scan(self, bdc_type, field='createdTime', start=None, end=None, partitions=4, workers=4,
+             sort=[], filters=[], page_size=999, lazy=False):
+        """Lists every matching Billdotcom object by splitting the query into disjoint time
+        ranges and fetching them concurrently. A full export then takes about as long as the
+        slowest partition instead of the sum of all of them.
+
+        Each partition adds a `field >= lower` and `field < upper` filter to `filters` and is
+        paged through with :func:`iter_list`. For example, to export all bills in eight
+        partitions on four threads:
+            >>> with Session() as s:
+            >>>     bills = s.scan('Bill', partitions=8, workers=4)
+
+        Args:
+            bdc_type: A Billdotcom object type. See :func:`list` for the supported types.
+
+            field: The DateTime field to partition on. Default 'createdTime'.
+
+            start: Inclusive lower bound as a date, datetime or ISO 8601 string. If omitted,
+                the earliest value on the server is used. Naive values are taken as UTC.
+
+            end: Exclusive upper bound, in the same formats as `start`. If omitted, everything
+                up to and including the latest value on the server is scanned.
+
+            partitions: Number of ranges to split the scan into. Default 4.
+
+            workers: Number of partitions fetched at the same time. Default 4.
+
+            sort: A list of tuples representing sort order. See :func:`list`. If given, the
+                merged result is put in this order; otherwise it is in partition order.
+
+            filters: A list of tuples representing extra filters. See :func:`list`.
+
+            page_size: Records fetched per request. Default 999 (server maximum).
+
+            lazy: Return read-only views over the rows instead of full objects. See
+                :func:`list`. Default False.
+
         Returns:
-            List of objects from the server.
+            :class:`billdotcom.collection.EntityList` of objects from the server.
 
         Raises:
             BilldotcomError, ServerResponseError
         """
 
+        if partitions < 1 or workers < 1:
+            raise BilldotcomError('partitions and workers must be at least 1')
+
+        if start is None or end is None:
+            first = self._list_rows(bdc_type, [(field, 'asc')], filters, 0, 1)
+            last = self._list_rows(bdc_type, [(field, 'desc')], filters, 0, 1)
+
+            if not first:
+                return EntityList()
+
+            if start is None:
+                start = first[0][field]
+            if end is None:
+                # bounds are exclusive, so step past the newest record
+                end = _parse_datetime(last[0][field]) + datetime.timedelta(seconds=1)
+
+        start = _parse_datetime(start)
+        end = _parse_datetime(end)
+
+        if end <= start:
+            return EntityList()
+
+        step = (end - start) / partitions
+        bounds = [start + step * i for i in range(partitions)] + [end]
+        ranges = [
+            (_format_datetime(lower), _format_datetime(upper))
+            for lower, upper in zip(bounds, bounds[1:])
+            if lower < upper
+        ]
+
+        def fetch(bounds):
+            lower, upper = bounds
+            partition_filters = list(filters) + [(field, '>=', lower), (field, '<', upper)]
+            return list(self.iter_list(bdc_type, sort, partition_filters, page_size, lazy=lazy))
+
+        pool = ThreadPool(min(workers, len(ranges)))
+        try:
+            results = pool.map(fetch, ranges)
+        finally:
+            pool.terminate()
+
+        objects = EntityList(obj for result in results for obj in result)
+
+        if sort:
+            _sort_objects(objects, sort)
+
+        return objects
+
+    def _iter_stream(self, bdc_type, sort, filters, page_size, lazy):
+        """Yields objects from pages streamed one row at a time until the first short page."""
+
+        start = 0
+        while True:
+            rows = self._stream_rows(bdc_type, sort, filters, start, page_size)
+
+            count = 0
+            for row in rows:
+                count += 1
+                self._decode([row])
+                yield self._hydrate(row, lazy)
+
+            start += count
+            if count < page_size:
+                break
+
+    def _iter_pages(self, bdc_type, sort, filters, page_size):
+        """Yields pages of raw rows until the first short page."""
+
+        start = 0
+        while True:
+            rows = self._list_rows(bdc_type, sort, filters, start, page_size)
+            start += len(rows)
+            last_page = len(rows) < page_size
+
+            yield rows
+
+            if last_page:
+                break
+
+    def _list_rows(self, bdc_type, sort, filters, start, max):
+        """Fetches one page of raw rows from the List API. See :func:`list`."""
+
+        data = self._list_data(bdc_type, sort, filters, start, max)
+        return self.post('List/{}.json'.format(bdc_type), data)
+
+    def _stream_rows(self, bdc_type, sort, filters, start, max):
+        """Requests one page from the List API and returns an iterator that decodes its
+        raw rows as they arrive.
+        """
+
+        data = self._list_data(bdc_type, sort, filters, start, max)
+        return self._request('List/{}.json'.format(bdc_type), data, stream=True)
+
+    def _list_data(self, bdc_type, sort, filters, start, max):
+        """Builds the request data for one page of the List API."""
+
         if bdc_type not in self.type_map:
             raise BilldotcomError('object type {} is not supported'.format(bdc_type))
 
@@ -230,37 +952,72 @@ class Session(object):
                 for field, op, value in filters
             ]
 
-        response = self.post('List/{}.json'.format(bdc_type), data)
-
-        return [self.type_map[row['entity']](**row) for row in response]
+        return data
 
     def __enter__(self):
         self.login()
         return self
 
     def __exit__(self, type, value, traceback):
-        self.logout()
+        try:
+            self.logout()
+        finally:
+            if self._owns_transport:
+                self.transport.close()
 
     def login(self):
-        """Initiate a session on the server."""
+        """Initiate a session on the server.
+
+        With a token store, a still-valid session id stored for the same devKey,
+        organization and user is reused instead.
+        """
+
+        data = self._login_data()
+
+        def send():
+            return https_post('Login.json', data, transport=self.transport, rate_limiter=self.rate_limiter)
+
+        with self._lock:
+            if self.token_store is None:
+                response = self.retry_policy.call(send)
+                self.session_id = response['sessionId']
+                return
+
+            key = self.token_store.key(data['devKey'], data['orgId'], data['userName'])
+
+            with self.token_store.lock():
+                session_id = self.token_store.get(key)
 
-        data = {
+                if not session_id:
+                    response = self.retry_policy.call(send)
+                    session_id = response['sessionId']
+                    self.token_store.set(key, session_id)
+
+            self.session_id = session_id
+
+    def _login_data(self):
+        """Gets the login details, from the session if given or else the configuration."""
+
+        return {
             'devKey': self.appkey,
-            'userName': CONFIG.get('authentication', 'email'),
-            'password': CONFIG.get('authentication', 'password'),
-            'orgId': CONFIG.get('organization', 'id'),
+            'userName': self.email or CONFIG.get('authentication', 'email'),
+            'password': self.password or CONFIG.get('authentication', 'password'),
+            'orgId': self.org_id or CONFIG.get('organization', 'id'),
         }
 
-        response = https_post('Login.json', data)
+    def logout(self):
+        """Shut down a session on the server.
 
-        self.session_id = response['sessionId']
+        With a token store the session id is shared, so it is only forgotten locally
+        and left to be reused until it expires.
+        """
 
-    def logout(self):
-        """Shut down a session on the server."""
+        with self._lock:
+            if not self.session_id:
+                raise BilldotcomError("cannot logout on a session that has not logged in")
 
-        if not self.session_id:
-            raise BilldotcomError("cannot logout on a session that has not logged in")
+            if self.token_store is None:
+                self.post('Logout.json')
 
-        self.post('Logout.json')
-        self.session_id = None
+            self.session_id = None
 
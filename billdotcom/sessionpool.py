@@ -0,0 +1,154 @@
+"""
+.. module:: sessionpool
+   :synopsis: A pool of logged-in sessions shared by many threads.
+"""
+
+import contextlib
+import Queue
+import threading
+import time
+from .exceptions import BilldotcomError
+from .https import Transport
+from .session import Session
+from .tokenstore import SESSION_TIMEOUT, REFRESH_MARGIN
+
+
+class SessionPool(object):
+    """Holds up to `size` logged-in sessions for the same organization and leases
+    them out to threads, so that each thread has a session to itself and the work
+    is spread over several session ids on the server side:
+
+        >>> with SessionPool(size=8) as pool:
+        >>>     def work(id):
+        >>>         with pool.lease() as s:
+        >>>             return s.read('Bill', id)
+        >>>     bills = ThreadPool(8).map(work, bill_ids)
+
+    Sessions are logged in the first time they are needed, handed out least recently
+    used first, logged in again once they are older than `max_age`, and logged out
+    when the pool is closed. All of them share one pooled transport.
+
+    The sessions need their own session ids, so don't give them a token store.
+
+    Args:
+        size (int): The most sessions to hold.
+        max_age (float): Seconds after login at which a session is logged in again.
+        factory: A function returning a new, logged-out Session. By default sessions are
+            made from the other keyword arguments.
+    """
+
+    def __init__(self, size=4, max_age=SESSION_TIMEOUT - REFRESH_MARGIN, factory=None, clock=time.time, **kwargs):
+        if size < 1:
+            raise BilldotcomError('pool size must be at least 1, got {}'.format(size))
+
+        # a transport made here is closed with the pool
+        self._transport = None
+
+        if factory is None:
+            if kwargs.get('transport') is None:
+                kwargs['transport'] = self._transport = Transport(pool_maxsize=size)
+            factory = lambda: Session(**kwargs)
+
+        self.size = size
+        self.max_age = max_age
+        self.factory = factory
+        self.clock = clock
+
+        # idle sessions, or None for a session that has not been made yet
+        self._idle = Queue.Queue()
+        for _ in range(size):
+            self._idle.put(None)
+
+        self._logged_in_at = {}
+        self._sessions = []
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def lease(self, timeout=None):
+        """Borrows a logged-in session, waiting for one to be free if they are all in use.
+        The session goes back to the pool when the block ends.
+
+        Args:
+            timeout (float): The most seconds to wait. None waits forever.
+
+        Raises:
+            BilldotcomError if the pool is closed or no session was free in time.
+        """
+
+        session = self._checkout(timeout)
+        try:
+            yield session
+        finally:
+            self._idle.put(session)
+
+    def run(self, function, *args, **kwargs):
+        """Calls `function(session, *args, **kwargs)` with a leased session.
+
+        Returns:
+            What `function` returned.
+        """
+
+        with self.lease() as session:
+            return function(session, *args, **kwargs)
+
+    def _checkout(self, timeout):
+        if self._closed:
+            raise BilldotcomError('the session pool is closed')
+
+        try:
+            session = self._idle.get(timeout=timeout)
+        except Queue.Empty:
+            raise BilldotcomError('no session was free after {} seconds'.format(timeout))
+
+        try:
+            if session is None:
+                session = self.factory()
+                with self._lock:
+                    self._sessions.append(session)
+
+            logged_in_at = self._logged_in_at.get(id(session))
+
+            if not session.session_id or logged_in_at is None or self.clock() - logged_in_at >= self.max_age:
+                if session.session_id:
+                    self._logout(session)
+                session.login()
+                self._logged_in_at[id(session)] = self.clock()
+        except:
+            # give the slot back so the pool doesn't shrink
+            self._idle.put(session)
+            raise
+
+        return session
+
+    def _logout(self, session):
+        try:
+            session.logout()
+        except BilldotcomError:
+            # an expired session can't be logged out, which is fine
+            session.session_id = None
+
+    def close(self):
+        """Logs out every session. Sessions that are leased out are logged out too, so
+        only close the pool once the threads using it are done.
+        """
+
+        self._closed = True
+
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+
+        for session in sessions:
+            if session.session_id:
+                self._logout(session)
+
+        self._logged_in_at.clear()
+
+        if self._transport is not None:
+            self._transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
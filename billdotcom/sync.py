@@ -0,0 +1,220 @@
+"""
+.. module:: sync
+   :synopsis: Keeping a local copy of Bill.com objects current from their updatedTime.
+"""
+
+import datetime
+import threading
+import time
+from .config import get_logger
+from .exceptions import BilldotcomError
+from .session import Session, _format_datetime, _parse_datetime
+
+
+def _canonical_time(value):
+    """Formats an updatedTime the same way whatever form it came in, so marks compare
+    as strings.
+    """
+    return _format_datetime(_parse_datetime(value))
+
+
+class MemoryStore(object):
+    """A :class:`SyncEngine` store that keeps server response rows in a dict, for small
+    datasets and tests. :class:`billdotcom.mirror.SQLiteMirror` is a persistent store.
+
+    A store needs `upsert(rows)`, `delete(bdc_type, ids)`, `get_state(bdc_type)` and
+    `set_state(bdc_type, state)`, where the state is a JSON-compatible dict or None.
+    """
+
+    def __init__(self):
+        # (type, id) -> row
+        self.rows = {}
+        self.states = {}
+        self._lock = threading.Lock()
+
+    def upsert(self, rows):
+        with self._lock:
+            for row in rows:
+                self.rows[(row['entity'], row['id'])] = row
+        return len(rows)
+
+    def delete(self, bdc_type, ids):
+        with self._lock:
+            for id in ids:
+                self.rows.pop((bdc_type, id), None)
+
+    def get_state(self, bdc_type):
+        with self._lock:
+            return self.states.get(bdc_type)
+
+    def set_state(self, bdc_type, state):
+        with self._lock:
+            self.states[bdc_type] = state
+
+
+class SyncEngine(object):
+    """Keeps a local store in step with Bill.com by fetching only the objects changed
+    since the last sync, so each run costs about as much as the changes made since,
+    however many objects there are:
+
+        >>> mirror = SQLiteMirror('/var/lib/billing/billdotcom.db')
+        >>> with Session() as s:
+        >>>     engine = SyncEngine(s, mirror)
+        >>>     engine.sync()
+        >>> print engine.lag('Bill')
+
+    For each type the store keeps a high-water mark: the newest updatedTime stored,
+    and the ids stored with exactly that time. A run lists the objects with an
+    updatedTime at or after the mark, oldest first, skipping the ids already stored at
+    the mark. Pages continue from the newest time seen, so objects changed while a sync
+    is running aren't skipped, and many objects sharing one updatedTime are paged
+    through. The mark is saved after each page, so an interrupted sync resumes where
+    it stopped. The first run for a type copies everything.
+
+    Deleted objects are deactivated by Bill.com, which changes their updatedTime, so
+    they arrive as changes with isActive '2'. They are stored like any other change,
+    or removed from the store if `delete_inactive` is set. Don't filter on isActive,
+    or deactivations won't be seen.
+
+    Args:
+        session (Session): A logged-in session.
+        store: Where objects and marks are kept. See :class:`MemoryStore`.
+        types: The object types to sync. Default every type in
+            :attr:`billdotcom.session.Session.type_map`.
+        filters (dict): Extra list filters for each type, which limit what is synced.
+        page_size (int): Records fetched per request.
+        overlap (float): Seconds before the mark to fetch again, to pick up changes the
+            server commits late with an older updatedTime. Stored objects are written
+            again, which is harmless. Default 0.
+        delete_inactive (bool): Remove deactivated objects from the store.
+    """
+
+    def __init__(self, session, store, types=None, filters=None, page_size=999, overlap=0,
+                 delete_inactive=False, clock=time.time):
+        if not 0 < page_size <= 999:
+            raise BilldotcomError('page size must be between 1 and 999, got {}'.format(page_size))
+
+        self.session = session
+        self.store = store
+        self.types = list(types or sorted(Session.type_map))
+        self.filters = filters or {}
+        self.page_size = page_size
+        self.overlap = overlap
+        self.delete_inactive = delete_inactive
+        self.clock = clock
+
+    def sync(self, types=None):
+        """Brings every type up to date, one type at a time.
+
+        Returns:
+            Dict of type to the stats from :func:`sync_type`.
+        """
+        return dict((bdc_type, self.sync_type(bdc_type)) for bdc_type in types or self.types)
+
+    def sync_type(self, bdc_type):
+        """Brings one type up to date.
+
+        Returns:
+            Dict with the number of `requests` sent, rows `fetched`, rows `upserted` and
+            `deleted` from the store, the new `mark`, the server time the store is now
+            current to as `synced_at`, and the `seconds` the sync took.
+
+        Raises:
+            BilldotcomError, ServerResponseError
+        """
+
+        if bdc_type not in Session.type_map:
+            raise BilldotcomError('object type {} is not supported'.format(bdc_type))
+
+        started = self.clock()
+        # everything changed before now will be stored once the sync finishes
+        synced_at = _canonical_time(self.session.getcurrenttime())
+
+        state = self.store.get_state(bdc_type) or {}
+        mark = state.get('mark')
+        seen = set(state.get('seen', []))
+
+        stats = dict(requests=1, fetched=0, upserted=0, deleted=0)
+
+        lower = mark
+        if mark is not None and self.overlap:
+            lower = _canonical_time(_parse_datetime(mark) - datetime.timedelta(seconds=self.overlap))
+
+        start = 0
+        while True:
+            filters = list(self.filters.get(bdc_type, []))
+            if lower is not None:
+                filters.append(('updatedTime', '>=', lower))
+
+            rows = self.session._list_rows(bdc_type, [('updatedTime', 'asc')], filters, start, self.page_size)
+            stats['requests'] += 1
+            stats['fetched'] += len(rows)
+
+            page_mark = mark
+            changed = []
+            for row in rows:
+                updated = _canonical_time(row['updatedTime'])
+
+                if mark is not None and (updated < mark or (updated == mark and row['id'] in seen)):
+                    if self.overlap:
+                        # refetched by the overlap, written again in case it changed
+                        changed.append(row)
+                    continue
+
+                changed.append(row)
+
+                if mark is None or updated > mark:
+                    mark = updated
+                    seen = set()
+                seen.add(row['id'])
+
+            self._apply(bdc_type, changed, stats)
+            self.store.set_state(bdc_type, dict(state, mark=mark, seen=sorted(seen)))
+
+            if len(rows) < self.page_size:
+                break
+
+            if mark == page_mark:
+                # nothing on the page moved the mark, so step over it instead of asking again
+                start += self.page_size
+            else:
+                start = 0
+                lower = mark
+
+        stats.update(mark=mark, synced_at=synced_at, seconds=self.clock() - started)
+        self.store.set_state(bdc_type, dict(mark=mark, seen=sorted(seen), synced_at=synced_at))
+
+        get_logger().info('synced {}: {}'.format(bdc_type, stats))
+        return stats
+
+    def _apply(self, bdc_type, rows, stats):
+        if self.delete_inactive:
+            inactive = [row['id'] for row in rows if str(row.get('isActive')) == '2']
+            if inactive:
+                self.store.delete(bdc_type, inactive)
+                stats['deleted'] += len(inactive)
+            rows = [row for row in rows if str(row.get('isActive')) != '2']
+
+        if rows:
+            self.store.upsert(rows)
+            stats['upserted'] += len(rows)
+
+    def lag(self, bdc_type, now=None):
+        """Gets how far behind the server a type's copy may be: the time since the start
+        of its last finished sync.
+
+        Args:
+            now (datetime): The current server time. Defaults to the local clock in UTC.
+
+        Returns:
+            timedelta, or None if the type has never been synced.
+        """
+
+        state = self.store.get_state(bdc_type) or {}
+        if not state.get('synced_at'):
+            return None
+
+        if now is None:
+            now = datetime.datetime.utcfromtimestamp(self.clock())
+
+        return _parse_datetime(now) - _parse_datetime(state['synced_at'])
@@ -0,0 +1,179 @@
+"""
+.. module:: tokenstore
+   :synopsis: Stores logged-in session ids so they can be reused.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # no cross-process locking on this platform
+    fcntl = None
+
+# Bill.com sessions time out after 35 minutes
+SESSION_TIMEOUT = 35 * 60
+
+# stop handing out a session id this many seconds before it would time out
+REFRESH_MARGIN = 5 * 60
+
+
+class SessionStore(object):
+    """Keeps session ids from :func:`billdotcom.session.Session.login` in memory so that
+    later sessions for the same devKey, organization and user can skip logging in.
+
+    Session ids are handed out until `refresh_margin` seconds before they would time out,
+    after which the next login gets a fresh one:
+
+        >>> store = SessionStore()
+        >>> with Session(token_store=store) as s:
+        >>>     # logs in
+        >>> with Session(token_store=store) as s:
+        >>>     # reuses the session id
+
+    Sessions that use a store don't log out when they are done, since the session id
+    is shared. The store is safe to share between threads.
+
+    Args:
+        timeout (float): Seconds a session id is valid for after login.
+        refresh_margin (float): Seconds before the timeout at which a session id is
+            considered expired.
+    """
+
+    def __init__(self, timeout=SESSION_TIMEOUT, refresh_margin=REFRESH_MARGIN, clock=time.time):
+        self.timeout = timeout
+        self.refresh_margin = refresh_margin
+        self.clock = clock
+
+        self._tokens = {}
+        self._lock = threading.RLock()
+        self._depth = 0
+
+    @staticmethod
+    def key(devkey, org_id, username):
+        """Builds the store key for a devKey, organization and user."""
+        return '{}|{}|{}'.format(devkey, org_id, username)
+
+    @contextlib.contextmanager
+    def lock(self):
+        """Holds the store lock. Use it around a get, login and set so that only one
+        caller logs in when the stored session id has expired. The lock is reentrant.
+        """
+
+        with self._lock:
+            self._depth += 1
+            try:
+                if self._depth == 1:
+                    self._acquire()
+                try:
+                    yield
+                finally:
+                    if self._depth == 1:
+                        self._release()
+            finally:
+                self._depth -= 1
+
+    def get(self, key):
+        """Gets a session id that is still valid.
+
+        Returns:
+            The session id, or None if there is none or it is about to expire.
+        """
+
+        with self.lock():
+            entry = self._load().get(key)
+
+        if not entry or entry['expires'] - self.refresh_margin <= self.clock():
+            return None
+
+        return entry['sessionId']
+
+    def set(self, key, session_id):
+        """Stores a session id that was just logged in."""
+
+        with self.lock():
+            tokens = self._load()
+            tokens[key] = dict(
+                sessionId = session_id,
+                expires = self.clock() + self.timeout
+            )
+            self._save(tokens)
+
+    def delete(self, key, session_id=None):
+        """Forgets a session id, for example after the server rejected it.
+
+        Args:
+            session_id (str): If given, only forget the stored session id if it is this
+                one, so a session id another process just stored is kept.
+        """
+
+        with self.lock():
+            tokens = self._load()
+            entry = tokens.get(key)
+
+            if entry and session_id in (None, entry['sessionId']):
+                del tokens[key]
+                self._save(tokens)
+
+    def _acquire(self):
+        pass
+
+    def _release(self):
+        pass
+
+    def _load(self):
+        return self._tokens
+
+    def _save(self, tokens):
+        self._tokens = tokens
+
+
+class FileSessionStore(SessionStore):
+    """A :class:`SessionStore` kept in a JSON file, so session ids are shared between
+    processes, for example by jobs started from cron:
+
+        >>> store = FileSessionStore(os.path.join(ROOT, 'sessions.json'))
+        >>> with Session(token_store=store) as s:
+        >>>     # do stuff
+
+    Access is serialized with an exclusive lock on `path + '.lock'`. The file holds
+    live session ids, so it is created readable by its owner only.
+
+    Args:
+        path (str): The file to keep session ids in.
+    """
+
+    def __init__(self, path, **kwargs):
+        super(FileSessionStore, self).__init__(**kwargs)
+        self.path = path
+        self._lockfile = None
+
+    def _acquire(self):
+        self._lockfile = open(self.path + '.lock', 'a')
+        if fcntl:
+            fcntl.flock(self._lockfile, fcntl.LOCK_EX)
+
+    def _release(self):
+        if fcntl:
+            fcntl.flock(self._lockfile, fcntl.LOCK_UN)
+        self._lockfile.close()
+        self._lockfile = None
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def _save(self, tokens):
+        # write a new file and rename it over the old one so readers never see half of it
+        temp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(tokens, f)
+        os.rename(temp_path, self.path)
@@ -4,6 +4,7 @@
 """
 
 from .jsondict import JSONDict
+from .schema import Schema, BOOLEAN, DATETIME, ENUM, ID, STRING
 
 
 class Vendor(JSONDict):
@@ -34,9 +35,12 @@ class Vendor(JSONDict):
 
         If you want to deactivate all your vendors, you might try something like this:
             >>> for vendor in s.list('Vendor'):
-            >>>     vendor['isActive'] = 2
+            >>>     vendor['isActive'] = '2'
             >>>     s.update(vendor)
 
+        Only the changed isActive field is sent, along with the required name, and
+        vendors that were already inactive aren't sent at all.
+
     Retrieval:
         Download a list of Vendor objects from the server with the Session.
         For example:
@@ -45,13 +49,46 @@ class Vendor(JSONDict):
             >>>     print s.list('Vendor')
     """
 
+    schema = Schema('Vendor', fields=(
+        ('id', ID),
+        ('isActive', ENUM),
+        ('name', STRING),
+        ('shortName', STRING),
+        ('nameOnCheck', STRING),
+        ('companyName', STRING),
+        ('accNumber', STRING),
+        ('taxId', STRING),
+        ('track1099', BOOLEAN),
+        ('address1', STRING),
+        ('address2', STRING),
+        ('address3', STRING),
+        ('address4', STRING),
+        ('addressCity', STRING),
+        ('addressState', STRING),
+        ('addressZip', STRING),
+        ('addressCountry', STRING),
+        ('email', STRING),
+        ('fax', STRING),
+        ('phone', STRING),
+        ('paymentEmail', STRING),
+        ('paymentPhone', STRING),
+        ('payBy', ENUM),
+        ('description', STRING),
+        ('contactFirstName', STRING),
+        ('contactLastName', STRING),
+        ('accountType', ENUM),
+        ('externalId', STRING),
+        ('mergedIntoId', ID),
+        ('createdTime', DATETIME),
+        ('updatedTime', DATETIME),
+    ), required=(
+        'name',
+    ))
+
     def __init__(self, ignore_required=False, **kwargs):
-        required = (
-            'name',
-        )
+        required = self.schema.required
 
         if ignore_required == True:
             required = ()
 
         super(Vendor, self).__init__('Vendor', required, **kwargs)
-
@@ -4,6 +4,70 @@
 """
 
 from .jsondict import JSONDict
+from .schema import Schema, BOOLEAN, DATE, DATETIME, ENUM, ID, NUMBER, STRING
+
+
+class VendorCreditLineItem(JSONDict):
+    """This models the VendorCreditLineItem object. It allows you to further describe a VendorCredit,
+    assigning amounts among individual line items.
+
+    Required:
+        ============= ========== =====================================================
+        *Argument*               *Description*
+        ------------------------ -----------------------------------------------------
+        amount        (Decimal)  The amount of money that is vendor credited on this line item.
+        ============= ========== =====================================================
+
+    Creation:
+        VendorCreditLineItems are created along with a VendorCredit. For example
+
+            >>> with Session() as s:
+            >>>     a = VendorCredit(
+            >>>         externalId = '123456',
+            >>>         vendorId = 'abc123',
+            >>>         invoiceNumber = 'BC1234',
+            >>>         invoiceDate = date(2012,10,1),
+            >>>         creditDate = date(2012,11,1),
+            >>>         amount = 5.0
+            >>>     )
+            >>>     a.add_line_item(VendorCreditLineItem(amount=2, description="eggs"))
+            >>>     a.add_line_item(VendorCreditLineItem(amount=3, description="bacon"))
+            >>>     a['id'] = s.create(a)
+
+    Retrieval:
+        See the :class:`billdotcom.vendorcredit.VendorCredit` class for how you can retrieve vendor credits.
+    """
+
+    schema = Schema('VendorCreditLineItem', fields=(
+        ('id', ID),
+        ('vendorCreditId', ID),
+        ('lineType', ENUM),
+        ('itemId', ID),
+        ('quantity', NUMBER),
+        ('unitPrice', NUMBER),
+        ('amount', NUMBER),
+        ('description', STRING),
+        ('chartOfAccountId', ID),
+        ('departmentId', ID),
+        ('locationId', ID),
+        ('actgClassId', ID),
+        ('jobId', ID),
+        ('customerId', ID),
+        ('jobBillable', BOOLEAN),
+        ('createdTime', DATETIME),
+        ('updatedTime', DATETIME),
+    ), required=(
+        'amount',
+    ))
+
+    def __init__(self, ignore_required=False, **kwargs):
+        required = self.schema.required
+
+        if ignore_required == True:
+            required = ()
+
+        super(VendorCreditLineItem, self).__init__('VendorCreditLineItem', required, **kwargs)
+
 
 class VendorCredit(JSONDict):
     """This models the VendorCredit object.
@@ -43,70 +107,47 @@ class VendorCredit(JSONDict):
             >>>     print [x['id'] for x in s.list('vendorcredit')]
     """
 
+    nested_map = {
+        'vendorCreditLineItems': VendorCreditLineItem
+    }
+
+    schema = Schema('VendorCredit', fields=(
+        ('id', ID),
+        ('isActive', ENUM),
+        ('vendorId', ID),
+        ('refNumber', STRING),
+        ('invoiceNumber', STRING),
+        ('invoiceDate', DATE),
+        ('dueDate', DATE),
+        ('creditDate', DATE),
+        ('glPostingDate', DATE),
+        ('amount', NUMBER),
+        ('appliedAmount', NUMBER),
+        ('description', STRING),
+        ('poNumber', STRING),
+        ('externalId', STRING),
+        ('createdTime', DATETIME),
+        ('updatedTime', DATETIME),
+    ), required=(
+        'vendorId',
+        'invoiceNumber',
+        'invoiceDate',
+        'dueDate',
+        'externalId',
+        'amount',
+    ), nested=nested_map)
+
     def __init__(self, ignore_required=False, **kwargs):
-        required = (
-            'vendorId',
-            'invoiceNumber',
-            'invoiceDate',
-            'dueDate',
-            'externalId',
-            'amount'
-        )
+        required = self.schema.required
 
         if ignore_required == True:
             required = ()
 
         super(VendorCredit, self).__init__('VendorCredit', required, **kwargs)
 
-        self.nested_map = {
-            'vendorCreditLineItems': VendorCreditLineItem
-        }
 
         self.convert_nested()
 
     def add_line_item(self, line_item):
         self.nested_object.setdefault('vendorCreditLineItems', [])
         self.nested_object['vendorCreditLineItems'].append(line_item)
-
-
-class VendorCreditLineItem(JSONDict):
-    """This models the VendorCreditLineItem object. It allows you to further describe a VendorCredit,
-    assigning amounts among individual line items.
-
-    Required:
-        ============= ========== =====================================================
-        *Argument*               *Description*
-        ------------------------ -----------------------------------------------------
-        amount        (Decimal)  The amount of money that is vendor credited on this line item.
-        ============= ========== =====================================================
-
-    Creation:
-        VendorCreditLineItems are created along with a VendorCredit. For example
-
-            >>> with Session() as s:
-            >>>     a = VendorCredit(
-            >>>         externalId = '123456',
-            >>>         vendorId = 'abc123',
-            >>>         invoiceNumber = 'BC1234',
-            >>>         invoiceDate = date(2012,10,1),
-            >>>         creditDate = date(2012,11,1),
-            >>>         amount = 5.0
-            >>>     )
-            >>>     a.add_line_item(VendorCreditLineItem(amount=2, description="eggs"))
-            >>>     a.add_line_item(VendorCreditLineItem(amount=3, description="bacon"))
-            >>>     a['id'] = s.create(a)
-
-    Retrieval:
-        See the :class:`billdotcom.vendorcredit.VendorCredit` class for how you can retrieve vendor credits.
-    """
-
-    def __init__(self, ignore_required=False, **kwargs):
-        required = (
-            'amount',
-        )
-
-        if ignore_required == True:
-            required = ()
-
-        super(VendorCreditLineItem, self).__init__('VendorCreditLineItem', required, **kwargs)
-
@@ -0,0 +1,330 @@
+"""
+.. module:: writebehind
+   :synopsis: Queueing creates and updates and sending them in batches.
+"""
+
+import atexit
+import collections
+import sys
+import threading
+import time
+from .config import get_logger
+from .exceptions import BilldotcomError
+
+
+class WriteFuture(object):
+    """The result of a queued write, available once its batch has been sent."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._result = None
+        self._error = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def done(self):
+        """Checks if the write has been sent."""
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """Waits for the write to be sent.
+
+        Args:
+            timeout (float): The most seconds to wait. None waits forever.
+
+        Returns:
+            The new object's ID for creates, or None for updates.
+
+        Raises:
+            The error the write failed with, or BilldotcomError if it timed out.
+        """
+
+        if not self._done.wait(timeout):
+            raise BilldotcomError('write was not sent after {} seconds'.format(timeout))
+
+        if self._error is not None:
+            raise self._error
+
+        return self._result
+
+    def exception(self, timeout=None):
+        """Waits for the write to be sent.
+
+        Returns:
+            The error the write failed with, or None.
+        """
+
+        if not self._done.wait(timeout):
+            raise BilldotcomError('write was not sent after {} seconds'.format(timeout))
+
+        return self._error
+
+    def add_done_callback(self, callback):
+        """Calls `callback(future)` once the write has been sent, or straight away if
+        it already has been. Callbacks run on the thread sending the batch.
+        """
+
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+
+        callback(self)
+
+    def _finish(self, result=None, error=None):
+        with self._lock:
+            self._result = result
+            self._error = error
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception:
+                get_logger().exception('write callback failed')
+
+
+class WriteBehindQueue(object):
+    """Queues creates and updates and sends them to Bill.com in batches on a
+    background thread, for applications that can wait a few seconds for a write.
+
+    Every write returns a :class:`WriteFuture` straight away. Repeated updates of an
+    object read from the server that haven't been sent yet are merged into the object
+    queued first: only the fields changed on the later copy are copied over, along
+    with line items added to it. Updates that can't be merged, because the objects
+    don't track their changes, are sent one after the other. A batch is sent once
+    `batch_size` writes are waiting or the oldest has waited `flush_interval` seconds:
+
+        >>> with Session() as s, WriteBehindQueue(s) as queue:
+        >>>     for bill in bills:
+        >>>         queue.create(bill).add_done_callback(lambda f: log(f.result()))
+
+    Writers block when `max_pending` writes are waiting. Everything still queued is
+    sent when the queue is closed, including when the interpreter exits.
+
+    Args:
+        session (Session): A logged-in session to send with.
+        batch_size (int): Writes that trigger a batch to be sent.
+        flush_interval (float): The most seconds a write waits before being sent.
+        max_pending (int): The most writes waiting before writers block.
+    """
+
+    def __init__(self, session, batch_size=100, flush_interval=2.0, max_pending=1000, clock=time.time):
+        self.session = session
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.clock = clock
+
+        # [(bdc_object, future)]
+        self._creates = collections.deque()
+        # token -> (bdc_object, [futures]), oldest first
+        self._updates = collections.OrderedDict()
+        # (type, id) -> the token of the object's latest queued update
+        self._latest = {}
+        # when the oldest waiting write was queued
+        self._oldest = None
+        self._sending = 0
+        self._flushing = False
+        self._closed = False
+        self._condition = threading.Condition()
+
+        self._thread = threading.Thread(target=self._run, name='billdotcom-write-behind')
+        self._thread.daemon = True
+        self._thread.start()
+
+        atexit.register(self.close)
+
+    def create(self, bdc_object, timeout=None):
+        """Queues a Billdotcom object to be created.
+
+        Args:
+            timeout (float): The most seconds to wait for room in the queue.
+
+        Returns:
+            WriteFuture resolving to the newly created object's ID.
+        """
+
+        future = WriteFuture()
+
+        with self._condition:
+            self._wait_for_room(timeout)
+            self._creates.append((bdc_object, future))
+            self._queued()
+
+        return future
+
+    def update(self, bdc_object, timeout=None):
+        """Queues an update of a Billdotcom object. The id field is required. If an
+        update of the same object is already waiting, the two are merged when both
+        track their changes.
+
+        Args:
+            timeout (float): The most seconds to wait for room in the queue.
+
+        Returns:
+            WriteFuture resolving to None once the update is sent.
+        """
+
+        if 'id' not in bdc_object:
+            raise BilldotcomError('the id field is required for updates')
+
+        future = WriteFuture()
+        key = (bdc_object.name, bdc_object['id'])
+
+        with self._condition:
+            pending = self._updates.get(self._latest.get(key))
+
+            if pending is not None and not self._closed:
+                merged, futures = pending
+                if merged is bdc_object or self._merge(merged, bdc_object):
+                    futures.append(future)
+                    return future
+
+            self._wait_for_room(timeout)
+            token = object()
+            self._updates[token] = (bdc_object, [future])
+            self._latest[key] = token
+            self._queued()
+
+        return future
+
+    @staticmethod
+    def _merge(merged, bdc_object):
+        """Copies the changes made to an object into another copy of it queued earlier.
+
+        Returns:
+            False if either doesn't track its changes, so they can't be merged.
+        """
+
+        if not (merged.tracked and bdc_object.tracked):
+            return False
+
+        for field in bdc_object.changed - set(bdc_object.nested_object):
+            if field in bdc_object:
+                merged[field] = bdc_object[field]
+            elif field in merged:
+                del merged[field]
+
+        for name, children in bdc_object.nested_object.items():
+            merged.nested_object.setdefault(name, []).extend(children)
+
+        return True
+
+    def flush(self):
+        """Sends everything queued and waits until it has been sent."""
+
+        with self._condition:
+            self._flushing = True
+            self._condition.notify_all()
+
+            while self._pending() or self._sending:
+                self._condition.wait()
+
+            self._flushing = False
+
+    def close(self):
+        """Sends everything queued, waits for it and stops the background thread."""
+
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def _pending(self):
+        return len(self._creates) + len(self._updates)
+
+    def _wait_for_room(self, timeout):
+        if self._closed:
+            raise BilldotcomError('the write-behind queue is closed')
+
+        deadline = None if timeout is None else self.clock() + timeout
+
+        while self._pending() >= self.max_pending:
+            remaining = None if deadline is None else deadline - self.clock()
+            if remaining is not None and remaining <= 0:
+                raise BilldotcomError('the write-behind queue is full')
+            self._condition.wait(remaining)
+
+    def _queued(self):
+        if self._oldest is None:
+            self._oldest = self.clock()
+        self._condition.notify_all()
+
+    def _due(self):
+        if not self._pending():
+            return False
+        if self._closed or self._flushing or self._pending() >= self.batch_size:
+            return True
+        return self.clock() - self._oldest >= self.flush_interval
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._due():
+                    if self._closed and not self._pending():
+                        return
+                    wait = None
+                    if self._pending():
+                        wait = max(0, self.flush_interval - (self.clock() - self._oldest))
+                    self._condition.wait(wait)
+
+                creates = [self._creates.popleft() for _ in range(min(self.batch_size, len(self._creates)))]
+                updates = []
+                keys = set()
+                while self._updates and len(updates) < self.batch_size:
+                    bdc_object, futures = next(iter(self._updates.values()))
+                    key = (bdc_object.name, bdc_object['id'])
+                    if key in keys:
+                        # unmerged updates of one object go in separate batches, in order
+                        break
+                    keys.add(key)
+
+                    token, update = self._updates.popitem(last=False)
+                    if self._latest.get(key) is token:
+                        del self._latest[key]
+                    updates.append(update)
+
+                self._oldest = self.clock() if self._pending() else None
+                self._sending += 1
+                # wake writers waiting for room
+                self._condition.notify_all()
+
+            try:
+                self._send(creates, updates)
+            finally:
+                with self._condition:
+                    self._sending -= 1
+                    self._condition.notify_all()
+
+    def _send(self, creates, updates):
+        if creates:
+            self._send_batch(self.session.bulk_create, [(obj, [future]) for obj, future in creates])
+
+        if updates:
+            self._send_batch(self.session.bulk_update, updates)
+
+    def _send_batch(self, send, writes):
+        try:
+            results = send([obj for obj, _ in writes])
+        except Exception:
+            error = sys.exc_info()[1]
+            get_logger().error('write-behind batch of {} failed: {}'.format(len(writes), error))
+            results = [error] * len(writes)
+
+        for (_, futures), result in zip(writes, results):
+            for future in futures:
+                if isinstance(result, Exception):
+                    future._finish(error=result)
+                else:
+                    future._finish(result=result)
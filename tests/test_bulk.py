@@ -0,0 +1,131 @@
+"""Tests for the Session bulk calls against a local stand-in for the Bill.com API.
+
+Run with `python -m unittest discover tests`.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+import urlparse
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+# keep the log directory out of the working directory
+os.environ.setdefault('BILLDOTCOM_PREFIX', tempfile.mkdtemp())
+
+from billdotcom import Customer, Session, ServerResponseError, Transport, Vendor
+
+
+def ok(data):
+    return dict(response_status=0, response_message='Success', response_data=data)
+
+
+def error(code, message):
+    return dict(response_status=1, response_message='Error',
+                response_data=dict(error_code=code, error_message=message))
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers Bulk/Crud requests, rejecting any item whose name starts with 'bad'."""
+
+    def do_POST(self):
+        form = urlparse.parse_qs(self.rfile.read(int(self.headers['Content-Length'])))
+        data = json.loads(form['data'][0])
+        path = self.path.split('/v2/', 1)[1]
+        operation, url = path.split('/')[2:4]
+
+        self.server.requests.append((path, len(data['bulkList'])))
+
+        results = []
+        for item in data['bulkList']:
+            obj = item.get('obj', item)
+            if obj.get('name', obj.get('id', '')).startswith('bad'):
+                results.append(error('BDC_1102', 'rejected ' + obj.get('name', obj.get('id'))))
+            elif operation == 'Create':
+                results.append(ok(dict(obj, id=url[:3] + '-' + obj['name'])))
+            else:
+                results.append(ok(dict(id=obj['id'])))
+
+        body = json.dumps(ok(results))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class BulkTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), StandInHandler)
+        cls.server.requests = []
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests[:] = []
+        api_url = 'http://127.0.0.1:{}/api/v2'.format(self.server.server_port)
+        self.transport = Transport(api_url=api_url)
+        self.session = Session(session_id='S1', appkey='key', transport=self.transport)
+
+    def tearDown(self):
+        self.transport.close()
+
+    def test_bulk_create_mixed_types_in_input_order(self):
+        objects = []
+        for i in range(230):
+            name = '{}{}'.format('bad' if i % 7 == 3 else 'ok', i)
+            objects.append(Vendor(name=name) if i % 3 else Customer(name=name))
+
+        results = self.session.bulk_create(objects)
+
+        self.assertEqual(len(results), len(objects))
+        for bdc_object, result in zip(objects, results):
+            if bdc_object['name'].startswith('bad'):
+                self.assertIsInstance(result, ServerResponseError)
+                self.assertEqual(result.error_code, 'BDC_1102')
+                self.assertIn(bdc_object['name'], result.message)
+            else:
+                self.assertEqual(result, bdc_object.name[:3] + '-' + bdc_object['name'])
+
+        # one type per request and no more than bulk_max items in each
+        sent = {}
+        for path, count in self.server.requests:
+            self.assertLessEqual(count, Session.bulk_max)
+            sent[path] = sent.get(path, 0) + count
+
+        self.assertEqual(sent, {
+            'Bulk/Crud/Create/Vendor.json': 153,
+            'Bulk/Crud/Create/Customer.json': 77,
+        })
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_bulk_delete_in_input_order(self):
+        ids = ['{}{}'.format('bad' if i % 5 == 0 else 'id', i) for i in range(205)]
+
+        results = self.session.bulk_delete('Vendor', ids)
+
+        self.assertEqual(len(results), len(ids))
+        for id, result in zip(ids, results):
+            if id.startswith('bad'):
+                self.assertIsInstance(result, ServerResponseError)
+                self.assertIn(id, result.message)
+            else:
+                self.assertIsNone(result)
+
+        self.assertEqual([count for _, count in self.server.requests], [100, 100, 5])
+
+
+if __name__ == '__main__':
+    unittest.main()